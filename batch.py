@@ -0,0 +1,190 @@
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from engine import Engine
+from shared_instance import SharedInstance
+
+# instances loaded by parent process, inherited by forked workers
+INSTANCES = dict()
+# shared memory instances attached by worker, kept open while worker lives
+ATTACHED = []
+
+
+def run_job(job, progress_callback=None):
+    """
+    Executes single run in worker process, instance is loaded if parent didn't load it
+
+    :param job: tuple
+        Instance file name, engine configuration, seed
+    :param progress_callback: function, optional
+        Called after every generation with generation number and best fitness
+    :return: dict
+        Result row
+    """
+    file_name, config, seed = job
+
+    if file_name not in INSTANCES:
+        loaded = Engine()
+        loaded.load_data(file_name)
+        INSTANCES[file_name] = loaded
+
+    engine = Engine(**config)
+    engine.share_data(INSTANCES[file_name])
+    engine.progress_callback = progress_callback
+
+    random.seed(seed)
+    start = time.perf_counter()
+    operator_stats = engine.run()
+    run_time = time.perf_counter() - start
+    # logs are not part of the result
+    engine.release_spill()
+
+    best = engine.population[0] if engine.keep_best else engine.best_entity
+
+    return {'instance': file_name,
+            'config': json.dumps(config, sort_keys=True),
+            'seed': seed,
+            'generations': engine.generation,
+            'fitness': round(best.fitness, 4),
+            'evaluations': engine.evaluations,
+            'time': round(run_time, 4),
+            'memory_peak': engine.memory_peak.get('total', 0),
+            'seeding_time': round(engine.seeding_time, 4),
+            'time_to_best': engine.time_to_quality(best.fitness)[1] if engine.keep_best else None,
+            'phases': json.dumps({k: round(v, 4) for k, v in engine.phase_times.items()}),
+            'operators': json.dumps(operator_stats, sort_keys=True) if operator_stats else None}
+
+
+def uses_distances(config):
+    """
+    Checks if runs with configuration read distance matrix, that is batch evaluation backends, random search
+    and local search with statically selected items
+
+    :param config: dict
+        Engine keyword arguments
+    :return: bool
+        True if distance matrix is used
+    """
+    if config.get('knapsack_method', 'greedy') != 'greedy' or config.get('greedy_type', 'static') != 'static':
+        return False
+
+    return config.get('evaluation_backend', 'object') in ('batch', 'process', 'auto') \
+        or config.get('selection_method') == 'random' or config.get('memetic_top_k', 0) > 0
+
+
+def attach_instances(descriptors):
+    """
+    Replaces inherited instances of worker with instances attached to shared memory
+
+    :param descriptors: dict
+        Dictionary mapping file name -> SharedInstance descriptor
+    """
+    for file_name, descriptor in descriptors.items():
+        instance = SharedInstance(descriptor)
+        ATTACHED.append(instance)
+
+        engine = Engine()
+        instance.load_into(engine)
+        INSTANCES[file_name] = engine
+
+
+class BatchRunner:
+    """
+    Runs every configuration with every seed on multiple instances in parallel
+
+    instances - Names of data files
+    configs - List of engine keyword arguments
+    seeds - List of random seeds
+    results - Rows of results table
+    """
+    COLUMNS = ('instance', 'config', 'seed', 'generations', 'fitness', 'evaluations', 'time', 'memory_peak',
+               'seeding_time', 'time_to_best', 'phases', 'operators')
+
+    def __init__(self, configs, seeds=(0,), pattern='*.ttp'):
+        """
+        :param configs: list
+            List of dictionaries with engine keyword arguments
+        :param seeds: list, optional
+            Seeds used for every configuration
+        :param pattern: str, optional
+            Glob pattern of data files in Engine.DATA_DIR
+        """
+        self.instances = sorted(os.path.basename(p) for p in glob.glob(os.path.join(Engine.DATA_DIR, pattern)))
+        self.configs = list(configs)
+        self.seeds = list(seeds)
+        self.results = []
+
+    def load(self):
+        """
+        Loads every instance once, forked workers share loaded data
+        """
+        for file_name in self.instances:
+            if file_name not in INSTANCES:
+                engine = Engine()
+                engine.load_data(file_name)
+                INSTANCES[file_name] = engine
+
+    def jobs(self):
+        """
+        Creates list of all runs
+
+        :return: list
+            List of (instance, config, seed) tuples
+        """
+        return [(i, c, s) for i in self.instances for c in self.configs for s in self.seeds]
+
+    def run(self, workers=None, shared=False):
+        """
+        Executes all runs
+
+        :param workers: int, optional
+            Number of worker processes, defaults to number of cores
+        :param shared: bool, optional
+            If instances should be moved to shared memory, workers attach to it instead of using inherited copies,
+            distance matrix is shared too if any configuration uses it
+        :return: list
+            Results rows
+        """
+        self.load()
+
+        jobs = self.jobs()
+        if workers == 1:
+            self.results = [run_job(job) for job in jobs]
+            return self.results
+
+        context = multiprocessing.get_context('fork')
+        if not shared:
+            with context.Pool(workers) as pool:
+                self.results = pool.map(run_job, jobs, chunksize=1)
+            return self.results
+
+        distances = any(uses_distances(config) for config in self.configs)
+        instances = dict()
+        try:
+            for file_name in self.instances:
+                instances[file_name] = SharedInstance.create(INSTANCES.pop(file_name), distances)
+            descriptors = {file_name: instance.descriptor for file_name, instance in instances.items()}
+            with context.Pool(workers, initializer=attach_instances, initargs=(descriptors,)) as pool:
+                self.results = pool.map(run_job, jobs, chunksize=1)
+        finally:
+            for instance in instances.values():
+                instance.close()
+
+        return self.results
+
+    def save_csv(self, path):
+        """
+        Writes results table to csv file
+
+        :param path: str
+            Path to output file
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=BatchRunner.COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.results)
@@ -0,0 +1,12 @@
+from batch import BatchRunner
+
+CONFIGS = [{'generations': 100, 'crossover_method': 'pmx'},
+           {'generations': 100, 'crossover_method': 'ox'},
+           {'generations': 100, 'crossover_method': 'erx'}]
+SEEDS = range(5)
+
+runner = BatchRunner(CONFIGS, SEEDS)
+print('Instances: {}, runs: {}'.format(len(runner.instances), len(runner.jobs())))
+
+runner.run()
+runner.save_csv('batch_results.csv')
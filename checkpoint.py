@@ -0,0 +1,179 @@
+import array
+import os
+import pickle
+import random
+import threading
+import time
+
+from entity import Entity
+from generation_log import GenerationRecord
+from genetics import Genotype
+
+
+class Checkpoint:
+    """
+    Periodically saved engine state allowing to resume interrupted run
+
+    Snapshot is taken synchronously, encoding and writing is done in background thread. File is replaced atomically
+    so crash during writing leaves previous checkpoint intact.
+
+    path - Path to checkpoint file
+    writer - Thread writing last snapshot
+
+    VERSION - Version of file format
+    """
+    VERSION = 2
+
+    def __init__(self, path):
+        """
+        :param path: str
+            Path to checkpoint file
+        """
+        self.path = path
+        self.writer = None
+
+    def exists(self):
+        """
+        Checks if checkpoint file exists
+
+        :return: bool
+            If checkpoint file exists
+        """
+        return os.path.exists(self.path)
+
+    def save(self, engine, generation):
+        """
+        Takes snapshot of engine state and writes it in background
+
+        :param engine: Engine
+            Engine to save
+        :param generation: int
+            Number of current generation
+        """
+        tours = array.array('i')
+        for entity in engine.population:
+            tours.extend(entity.genotype.nodes_order)
+
+        best = None
+        if engine.best_entity is not None:
+            best = (array.array('i', engine.best_entity.genotype.nodes_order), engine.best_entity.fitness)
+
+        state = {'version': Checkpoint.VERSION,
+                 'generation': generation,
+                 'nodes_num': engine.nodes_num,
+                 'tours': tours,
+                 'fitness': array.array('d', [e.fitness for e in engine.population]),
+                 'best': best,
+                 'rng': random.getstate(),
+                 'logged_data': {k: array.array('d', v) for k, v in engine.logged_data.items()},
+                 'logged_num': engine.logged_num,
+                 'log_sink': None,
+                 'spilled': None,
+                 'random_tours': None if engine.random_tours is None else array.array('i', engine.random_tours),
+                 'random_fitness': None if engine.random_fitness is None else array.array('d', engine.random_fitness),
+                 'operators': None,
+                 'evaluations': engine.evaluations,
+                 'batch_evaluations': engine.batch_evaluations,
+                 'cache_evictions': engine.cache_evictions,
+                 'elapsed': time.perf_counter() - engine.run_start}
+
+        if engine.spill_sink is not None:
+            # temporary file of spilled logs doesn't survive restart, its records are saved
+            state['spilled'] = b''.join(record.pack() for record in engine.spill_sink.records())
+        elif engine.log_sink is not None:
+            state['log_sink'] = engine.log_sink.snapshot()
+
+        if engine.adaptive_operators:
+            state['operators'] = {name: {operator: (s.uses, s.successes, s.improvement, s.cpu_time)
+                                         for operator, s in selector.stats.items()}
+                                  for name, selector in (('crossover', engine.crossover_selector),
+                                                         ('mutation', engine.mutation_selector))}
+
+        # only one write at a time, older snapshot has to be finished first
+        self.wait()
+        self.writer = threading.Thread(target=self.write, args=(state,), daemon=True)
+        self.writer.start()
+
+    def write(self, state):
+        """
+        Encodes state and atomically replaces checkpoint file
+
+        :param state: dict
+            Engine state snapshot
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def wait(self):
+        """
+        Waits for background write to finish
+        """
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def load(self, engine):
+        """
+        Restores engine state from checkpoint file
+
+        :param engine: Engine
+            Engine with loaded data of the same problem
+        :return: tuple
+            Number of saved generation and time spent in run before it was saved
+        """
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+
+        if state['version'] != Checkpoint.VERSION or state['nodes_num'] != engine.nodes_num:
+            print('Checkpoint does not match engine')
+            exit(1)
+
+        nodes_num = state['nodes_num']
+        tours = state['tours']
+        engine.population = []
+        for i, fitness in enumerate(state['fitness']):
+            entity = Entity()
+            entity.genotype = Genotype()
+            entity.genotype.nodes_order = tours[i * nodes_num:(i + 1) * nodes_num].tolist()
+            entity.fitness = fitness
+            engine.population.append(entity)
+
+        engine.best_entity = None
+        if state['best'] is not None:
+            tour, fitness = state['best']
+            engine.best_entity = Entity()
+            engine.best_entity.genotype = Genotype()
+            engine.best_entity.genotype.nodes_order = tour.tolist()
+            engine.best_entity.fitness = fitness
+
+        random.setstate(state['rng'])
+        engine.logged_data = {k: v.tolist() for k, v in state['logged_data'].items()}
+        engine.logged_num = state['logged_num']
+
+        if state['spilled'] is not None:
+            if engine.spill_sink is None:
+                engine.spill_logs()
+            engine.spill_sink.clear()
+            for i in range(0, len(state['spilled']), GenerationRecord.SIZE):
+                engine.spill_sink.write(GenerationRecord.unpack(state['spilled'][i:i + GenerationRecord.SIZE]))
+        elif engine.log_sink is not None:
+            engine.log_sink.restore(state['log_sink'])
+
+        engine.random_tours = state['random_tours']
+        engine.random_fitness = state['random_fitness']
+
+        if state['operators'] is not None and engine.adaptive_operators:
+            for name, selector in (('crossover', engine.crossover_selector), ('mutation', engine.mutation_selector)):
+                for operator, values in state['operators'][name].items():
+                    s = selector.stats[operator]
+                    s.uses, s.successes, s.improvement, s.cpu_time = values
+
+        engine.evaluations = state['evaluations']
+        engine.batch_evaluations = state['batch_evaluations']
+        engine.cache_evictions = state['cache_evictions']
+
+        return state['generation'], state['elapsed']
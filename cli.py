@@ -0,0 +1,303 @@
+import argparse
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import random
+import sqlite3
+import sys
+import time
+
+# never open plot windows
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from batch import BatchRunner, run_job, INSTANCES
+from engine import Engine
+from evaluation import check_backends
+from regression import check
+
+ENGINE_PARAMS = {'population_size': int,
+                 'mutation_rate': float,
+                 'survival_rate': float,
+                 'selection_method': str,
+                 'crossover_method': str,
+                 'mutation_method': str,
+                 'mutation_neighbours': int,
+                 'tournament_size': int,
+                 'greedy_type': str,
+                 'greedy_method': str,
+                 'evaluation_backend': str,
+                 'roulette_scaling': str,
+                 'roulette_temperature': float,
+                 'roulette_pressure': float,
+                 'generations': int}
+
+
+def parse_args(argv=None):
+    """
+    Parses command line arguments
+
+    :param argv: list, optional
+        Arguments, defaults to sys.argv
+    :return: Namespace
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Genetic algorithm for travelling thief problem')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='single run on one instance')
+    run_parser.add_argument('instance', help='data file name in data directory')
+    run_parser.add_argument('--seed', type=int, default=None)
+    run_parser.add_argument('--info-every', type=int, default=None)
+
+    sweep_parser = subparsers.add_parser('sweep', help='runs configurations on multiple instances')
+    sweep_parser.add_argument('--instances', default='*.ttp', help='glob pattern of data files')
+    sweep_parser.add_argument('--param', action='append', default=[],
+                              help='swept parameter as name=value1,value2,...')
+    sweep_parser.add_argument('--seed', type=int, default=0, help='first seed')
+    sweep_parser.add_argument('--seeds', type=int, default=1, help='number of seeds')
+    sweep_parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    sweep_parser.add_argument('--shared', action='store_true',
+                              help='workers attach to instances in shared memory instead of private copies')
+
+    conformance_parser = subparsers.add_parser('conformance',
+                                               help='checks if all evaluation backends give equal fitness')
+    conformance_parser.add_argument('--instances', default='*.ttp', help='glob pattern of data files')
+    conformance_parser.add_argument('--samples', type=int, default=100, help='number of random paths')
+    conformance_parser.add_argument('--seed', type=int, default=0)
+    conformance_parser.add_argument('--format', choices=('json', 'csv', 'sqlite'), default='json')
+    conformance_parser.add_argument('--output', default=None, help='output file, stdout if not given (json/csv only)')
+    conformance_parser.add_argument('--profile', action='store_true')
+
+    regression_parser = subparsers.add_parser('regression',
+                                              help='compares seeded runs with golden outputs of previous version')
+    regression_parser.add_argument('--instances', default='*.ttp', help='glob pattern of data files')
+    regression_parser.add_argument('--case', action='append', default=None, help='name of case, all if not given')
+    regression_parser.add_argument('--tolerance', type=float, default=1e-9, help='maximal relative difference')
+    regression_parser.add_argument('--record', action='store_true', help='saves results as new golden outputs')
+    regression_parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    regression_parser.add_argument('--format', choices=('json', 'csv', 'sqlite'), default='json')
+    regression_parser.add_argument('--output', default=None, help='output file, stdout if not given (json/csv only)')
+    regression_parser.add_argument('--profile', action='store_true')
+
+    for p in (run_parser, sweep_parser):
+        for name, param_type in ENGINE_PARAMS.items():
+            p.add_argument('--' + name.replace('_', '-'), type=param_type, default=None)
+        p.add_argument('--time-budget', type=float, default=None, help='seconds per run')
+        p.add_argument('--evaluations', type=int, default=None, help='fitness evaluations per run')
+        p.add_argument('--format', choices=('json', 'csv', 'sqlite'), default='json')
+        p.add_argument('--output', default=None, help='output file, stdout if not given (json/csv only)')
+        p.add_argument('--profile', action='store_true',
+                       help='collect phase timings and print cProfile statistics of main process')
+
+    return parser.parse_args(argv)
+
+
+def engine_config(args):
+    """
+    Creates engine keyword arguments from parsed arguments
+
+    :param args: Namespace
+        Parsed arguments
+    :return: dict
+        Engine keyword arguments
+    """
+    config = dict()
+    for name in ENGINE_PARAMS:
+        value = getattr(args, name)
+        if value is not None:
+            config[name] = value
+    if args.time_budget is not None:
+        config['time_limit'] = args.time_budget
+    if args.evaluations is not None:
+        config['max_evaluations'] = args.evaluations
+    if args.profile:
+        config['profile'] = True
+    if 'generations' not in config and ('time_limit' in config or 'max_evaluations' in config):
+        # budget is the only stop condition
+        config['generations'] = None
+
+    return config
+
+
+def sweep_configs(base, params):
+    """
+    Creates cartesian product of swept parameters
+
+    :param base: dict
+        Fixed engine keyword arguments
+    :param params: list
+        List of name=value1,value2 strings
+    :return: list
+        List of engine keyword arguments
+    """
+    configs = [dict(base)]
+    for param in params:
+        name, values = param.split('=')
+        param_type = ENGINE_PARAMS.get(name, str)
+        configs = [dict(c, **{name: param_type(v)}) for c in configs for v in values.split(',')]
+
+    return configs
+
+
+def write_rows(rows, output_format, path=None):
+    """
+    Writes result rows in given format
+
+    :param rows: list
+        List of dictionaries with the same keys
+    :param output_format: str
+        json, csv or sqlite
+    :param path: str, optional
+        Output file, required for sqlite
+    """
+    if output_format == 'sqlite':
+        if path is None:
+            print('Output file required for sqlite format', file=sys.stderr)
+            exit(1)
+        columns = list(rows[0].keys())
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE IF NOT EXISTS results ({})'.format(', '.join(columns)))
+        connection.executemany('INSERT INTO results VALUES ({})'.format(', '.join('?' * len(columns))),
+                               [[row[c] for c in columns] for row in rows])
+        connection.commit()
+        connection.close()
+        return
+
+    out = io.StringIO()
+    if output_format == 'json':
+        json.dump(rows, out, indent=2)
+        out.write('\n')
+    else:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    if path is None:
+        sys.stdout.write(out.getvalue())
+    else:
+        with open(path, 'w', newline='') as f:
+            f.write(out.getvalue())
+
+
+def command_run(args):
+    """
+    Executes single run
+
+    :param args: Namespace
+        Parsed arguments
+    :return: list
+        Result rows
+    """
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    engine = Engine()
+    engine.load_data(args.instance)
+    INSTANCES[args.instance] = engine
+
+    row = run_job((args.instance, engine_config(args), seed))
+
+    return [row]
+
+
+def command_sweep(args):
+    """
+    Executes runs of all configurations on all matching instances
+
+    :param args: Namespace
+        Parsed arguments
+    :return: list
+        Result rows
+    """
+    configs = sweep_configs(engine_config(args), args.param)
+    runner = BatchRunner(configs, range(args.seed, args.seed + args.seeds), args.instances)
+
+    return runner.run(args.workers, args.shared)
+
+
+def command_conformance(args):
+    """
+    Compares fitness of all evaluation backends with reference backend on matching instances,
+    exits with error if any value differs
+
+    :param args: Namespace
+        Parsed arguments
+    :return: list
+        Result rows
+    """
+    runner = BatchRunner([], [], args.instances)
+    runner.load()
+
+    rows = []
+    for instance in runner.instances:
+        engine = INSTANCES[instance]
+        for greedy_method in ('weight', 'value', 'ratio'):
+            engine.greedy_method = greedy_method
+            engine.greedy_item_select()
+            for backend, mismatches in check_backends(engine, args.samples, args.seed).items():
+                rows.append({'instance': instance, 'greedy_method': greedy_method,
+                             'backend': backend, 'mismatches': mismatches})
+
+    if any(row['mismatches'] > 0 for row in rows):
+        write_rows(rows, args.format, args.output)
+        print('Evaluation backends differ', file=sys.stderr)
+        exit(1)
+
+    return rows
+
+
+def command_regression(args):
+    """
+    Runs regression cases and compares them with golden outputs, exits with error if any result differs
+
+    :param args: Namespace
+        Parsed arguments
+    :return: list
+        Report rows
+    """
+    rows = check(args.instances, args.case, args.tolerance, args.workers, args.record)
+
+    if any(row['status'] != 'ok' for row in rows):
+        write_rows(rows, args.format, args.output)
+        print('Results differ from golden outputs', file=sys.stderr)
+        exit(1)
+
+    return rows
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: list, optional
+        Arguments, defaults to sys.argv
+    """
+    args = parse_args(argv)
+    command = {'run': command_run,
+               'sweep': command_sweep,
+               'conformance': command_conformance,
+               'regression': command_regression}[args.command]
+
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    rows = command(args)
+    total_time = time.perf_counter() - start
+
+    if profiler is not None:
+        profiler.disable()
+        print('Total time: {:.4f}s'.format(total_time), file=sys.stderr)
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats('cumulative').print_stats(25)
+
+    if len(rows) > 0:
+        write_rows(rows, args.format, args.output)
+
+
+if __name__ == '__main__':
+    main()
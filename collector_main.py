@@ -1,4 +1,6 @@
-from collector import Collector, Test
+import sys
+
+from collector import Collector, RacingTest, Test
 
 SAMPLE_SIZE = 10
 PARAMS = {'generations': 250}
@@ -31,12 +33,16 @@ test_mut_shuf = Test(mutable_param='mutation_rate',
                      values=[i / 10 for i in range(11)],
                      sample=SAMPLE_SIZE,
                      parameters={'generations': 250, 'mutation_method': 'shuffle'})
+test_mut_neigh = Test(mutable_param='mutation_rate',
+                      values=[i / 10 for i in range(11)],
+                      sample=SAMPLE_SIZE,
+                      parameters={'generations': 250, 'mutation_method': 'neighbour'})
 test_surv = Test(mutable_param='survival_rate',
                  values=[i / 10 for i in range(11)],
                  sample=SAMPLE_SIZE,
                  parameters=PARAMS)
 test_cros_met = Test(mutable_param='crossover_method',
-                     values=['simple', 'ox', 'cx', 'pmx'],
+                     values=['simple', 'ox', 'cx', 'pmx', 'erx'],
                      sample=SAMPLE_SIZE,
                      parameters=PARAMS)
 test_greed = Test(mutable_param='greedy_type',
@@ -63,11 +69,17 @@ test_random = Test(mutable_param='selection_method',
                    values=['random', 'tournament'],
                    sample=SAMPLE_SIZE,
                    parameters=PARAMS)
+test_cros_race = RacingTest(mutable_param='crossover_method',
+                            values=['simple', 'ox', 'cx', 'pmx', 'erx'],
+                            sample=SAMPLE_SIZE,
+                            parameters=PARAMS,
+                            min_generations=25)
 
 # distribute tests
 # distribute_test(collectors, test_mut_swap) # done
 # distribute_test(collectors, test_mut_inv) # done
 # distribute_test(collectors, test_mut_shuf) # done
+# distribute_test(collectors, test_mut_neigh)
 # distribute_test(collectors, test_surv) # done
 # distribute_test(collectors, test_cros_met) # done
 # distribute_test(collectors, test_greed) TODO fix
@@ -76,6 +88,7 @@ test_random = Test(mutable_param='selection_method',
 # distribute_test(collectors, test_sel) # done
 # distribute_test(collectors, test_gen) # done
 # distribute_test(collectors, test_random) # done
+# distribute_test(collectors, test_cros_race)
 
 # estimate execution time
 total_time = 0
@@ -89,7 +102,8 @@ total_time -= (m * 60)
 s = total_time
 print('Estimated time: {:02}:{:02}:{:02}'.format(h, m, s))
 
-if input('Continue?[y/n]: ') != 'y':
+# ask only in interactive session
+if sys.stdin.isatty() and input('Continue?[y/n]: ') != 'y':
     exit(0)
 
 # execute
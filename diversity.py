@@ -0,0 +1,150 @@
+import array
+import collections
+import math
+
+
+class EdgeCounter:
+    """
+    Population diversity metrics updated incrementally from paths entering and leaving population
+
+    nodes_num - Number of nodes
+    counts - Matrix of directed edge occurrences, edge i -> j is at i * nodes_num + j
+    paths - Multiset of paths in population
+    paths_num - Number of paths in population
+    shared_pairs - Sum of c * (c - 1) / 2 over edge counts, number of edges shared by pairs of paths
+    count_log_sum - Sum of c * log(c) over edge counts
+    count_logs - Cached values of c * log(c)
+    """
+
+    def __init__(self, nodes_num):
+        """
+        :param nodes_num: int
+            Number of nodes
+        """
+        self.nodes_num = nodes_num
+        self.counts = array.array('i', bytes(4 * nodes_num * nodes_num))
+        self.paths = collections.Counter()
+        self.paths_num = 0
+        self.shared_pairs = 0
+        self.count_log_sum = 0
+        self.count_logs = [0]
+
+    def clear(self):
+        """
+        Removes all paths
+        """
+        self.counts = array.array('i', bytes(4 * self.nodes_num * self.nodes_num))
+        self.paths = collections.Counter()
+        self.paths_num = 0
+        self.shared_pairs = 0
+        self.count_log_sum = 0
+
+    def edges(self, path):
+        """
+        Indices of path edges in counts matrix
+
+        :param path: tuple
+            Order of visited nodes
+        :return: generator
+            Generator of edge indices
+        """
+        n = self.nodes_num
+        for k in range(len(path)):
+            yield path[k - 1] * n + path[k]
+
+    def add(self, path):
+        """
+        Adds path to population
+
+        :param path: tuple
+            Order of visited nodes
+        """
+        self.paths[path] += 1
+        self.paths_num += 1
+        while len(self.count_logs) <= self.paths_num:
+            c = len(self.count_logs)
+            self.count_logs.append(c * math.log(c))
+
+        count_logs = self.count_logs
+        counts = self.counts
+        for e in self.edges(path):
+            c = counts[e]
+            self.shared_pairs += c
+            self.count_log_sum += count_logs[c + 1] - count_logs[c]
+            counts[e] = c + 1
+
+    def remove(self, path):
+        """
+        Removes path from population
+
+        :param path: tuple
+            Order of visited nodes
+        """
+        self.paths[path] -= 1
+        self.paths_num -= 1
+        if self.paths[path] == 0:
+            del self.paths[path]
+        count_logs = self.count_logs
+        counts = self.counts
+        for e in self.edges(path):
+            c = counts[e]
+            self.shared_pairs -= c - 1
+            self.count_log_sum -= count_logs[c] - count_logs[c - 1]
+            counts[e] = c - 1
+
+    def update(self, paths):
+        """
+        Synchronizes counter with new population, only changed paths are processed
+
+        :param paths: list
+            Paths of current population
+        """
+        new_paths = collections.Counter(paths)
+
+        for path, count in (self.paths - new_paths).items():
+            for _ in range(count):
+                self.remove(path)
+        for path, count in (new_paths - self.paths).items():
+            for _ in range(count):
+                self.add(path)
+
+    def unique(self):
+        """
+        Counts unique paths
+
+        :return: int
+            Number of unique paths
+        """
+        return len(self.paths)
+
+    def mean_distance(self):
+        """
+        Calculates mean fraction of edges not shared by pair of paths
+
+        :return: float
+            Mean pairwise edge distance in <0, 1>
+        """
+        paths_num = self.paths_num
+        if paths_num < 2:
+            return 0
+
+        pairs = paths_num * (paths_num - 1) / 2
+        mean_shared = self.shared_pairs / pairs
+
+        return 1 - mean_shared / self.nodes_num
+
+    def entropy(self):
+        """
+        Calculates entropy of edges frequency normalized by entropy of uniformly random population
+
+        :return: float
+            Edge entropy in <0, 1>
+        """
+        total = self.paths_num * self.nodes_num
+        if total == 0:
+            return 0
+
+        h = math.log(total) - self.count_log_sum / total
+        h_max = math.log(min(total, self.nodes_num * (self.nodes_num - 1)))
+
+        return h / h_max if h_max > 0 else 0
@@ -1,9 +1,29 @@
+import array
+import hashlib
+import heapq
 import math
+import os
 import random
+import tempfile
+import threading
+import time
 
 from matplotlib import pyplot as plt
 
-from entity import Entity, Item, Node
+from checkpoint import Checkpoint
+from diversity import EdgeCounter
+from entity import Entity, ItemTable, Node
+from evaluation import PathEvaluator, ObjectBackend, create_backend
+from fitness_store import StoredFitnessDict
+from genetics import Genotype
+from generation_log import FileSink, GenerationRecord
+from local_search import LocalSearch
+from memory import engine_footprint
+from operators import OperatorSelector
+from sampling import AliasTable, rank_weights, softmax_weights
+from seeding import Seeder
+from spatial import KDTree
+from steady_state import SteadyPopulation
 
 
 class Engine:
@@ -20,11 +40,23 @@ class Engine:
     renting_ratio - Not used
     edge_weight_type - Not used
     nodes - List of nodes
+    spatial_index - KDTree of node positions for nearest neighbour queries
+    distance_matrix - Flat matrix of distances between nodes, only set for shared instances created with distances
     population - List of entities
 
     DATA_DIR - path to data directory
+    ANYTIME_SAFETY - Fraction of remaining time planned for generation in time-budgeted runs
+    INIT_CHUNK - Maximal number of entities created and tested at once during initialization of time-budgeted run
+    LOG_RESERVE - Multiple of measured time of creating path keys kept in reserve for logging initial population of
+                  time-budgeted run, at the end keys of all entities are created again from cold memory
+    SETUP_SHARE - Fraction of time budget available for optional preparation of run, that is benchmark of automatic
+                  backend selection, distances of local search and random search and heuristic seeding
     """
     DATA_DIR = 'data/'
+    ANYTIME_SAFETY = .8
+    INIT_CHUNK = 8
+    LOG_RESERVE = 2
+    SETUP_SHARE = .25
 
     def __init__(self,
                  population_size=100,
@@ -49,23 +81,39 @@ class Engine:
             Method of selection
                 -roulette
                 -tournament
+                -random - random search
+                -steady - steady-state, every generation steady_batch children chosen by tournaments replace the
+                          worst entities if they are not worse, best entity is always kept
         :param crossover_method: str, optional
             Method of crossover
                 -simple
                 -ox
                 -cx
                 -pmx
+                -erx
         :param mutation_method: str, option
             Method of mutation
                 -swap
                 -inverse
                 -shuffle
+                -neighbour - inversion making edge between random node and one of its nearest nodes
         :param knapsack_method: str, optional
             Method of item selection
                 -greedy - greedy algorithm, same items for all entities
         :param kwargs:
             :param tournament_size: int, optional
                 Number of randomly picked entities for tournaments
+            :param roulette_scaling: str, optional
+                Transformation of fitness into roulette weights
+                    -softmax - exp of fitness scaled by population range and divided by temperature
+                    -rank - linear ranking
+            :param roulette_temperature: float, optional
+                Temperature of softmax roulette, lower value gives higher selection pressure
+            :param roulette_pressure: float, optional
+                Selection pressure of rank roulette in <1, 2>, ratio of the best and the average weight,
+                the best entity is pressure / (2 - pressure) times more likely to be picked than the worst
+            :param steady_batch: int, optional
+                Number of children created in every generation of steady-state selection
             :param greedy_method: str, optional
                 Criteria by which items are picked
                     -weight
@@ -75,6 +123,73 @@ class Engine:
                 Type of greedy item picking algorithm
                     -static - all items are marked at the beginning
                     -dynamic - items are being marked for every entity
+            :param avoid_duplicates: bool, optional
+                If children identical to other entities in new population should be mutated again
+            :param duplicate_retries: int, optional
+                Maximal number of additional mutations of duplicated child
+            :param log_sink: MemorySink, FileSink or DatabaseSink, optional
+                Destination of generation statistics, if given logged_data is not filled
+            :param log_percentiles: bool, optional
+                If fitness quartiles should be included in generation statistics
+            :param log_diversity: bool, optional
+                If mean pairwise edge distance and edge entropy should be included in generation statistics
+            :param checkpoint_file: str, optional
+                Path to file where engine state is periodically saved, file sink of resumed run has to be opened
+                in append mode, runs with database sink can't be resumed
+            :param checkpoint_every: int, optional
+                Number of generations between checkpoints
+            :param adaptive_operators: bool, optional
+                If crossover and mutation should be picked for every child from all available operators by bandit
+                policy instead of using crossover_method and mutation_method
+            :param operator_exploration: float, optional
+                Weight of exploration in adaptive operator selection
+            :param time_limit: float, optional
+                Maximal run time in seconds, with time budget the number of children of generation is limited
+                so that it ends before budget runs out
+            :param deadline: float, optional
+                Wall-clock time (time.time()) at which run has to end, used like time_limit
+            :param best_callback: function, optional
+                Called with fitness and copy of path whenever best fitness improves
+            :param max_evaluations: int, optional
+                Maximal number of fitness evaluations, checked between generations
+            :param profile: bool, optional
+                If time of every generation phase should be measured in phase_times
+            :param fitness_store: FitnessStore, optional
+                Persistent fitness values shared between runs and processes
+            :param progress_callback: function, optional
+                Called after every generation with generation number and fitness of current best entity
+            :param metrics: Metrics, optional
+                Operational counters updated after every generation and periodically written to file
+            :param memory_limit: int, optional
+                Memory budget in bytes for cache, population and logs, when exceeded the oldest half of
+                fitness cache is dropped if cache is the biggest part and then logs are spilled to temporary file,
+                after the run spilled logs are read from log_sink, the file is removed by release_spill or
+                clear_logs
+            :param memetic_top_k: int, optional
+                Number of best entities improved with local search every generation, 0 disables it
+                Works only with static greedy item selection and generational selection
+            :param memetic_time: float, optional
+                Time budget for local search in every generation in seconds
+            :param memetic_neighbours: int, optional
+                Number of nearest nodes considered by local search moves
+            :param mutation_neighbours: int, optional
+                Number of nearest nodes from which neighbour mutation picks new edge
+            :param seeding: dict, optional
+                Fraction of initial population built by heuristics, the rest is random
+                Dictionary mapping method -> fraction
+                    -nearest - nearest neighbour tours
+                    -nearest_random - randomized nearest neighbour tours
+                    -greedy_edge - greedy edge tours
+                    -greedy_edge_random - randomized greedy edge tours
+            :param seeding_workers: int, optional
+                Number of processes building heuristic tours
+            :param evaluation_backend: str, optional
+                Implementation of fitness evaluation
+                    -object - Entity.test on node objects
+                    -batch - all new paths of generation at once over flat arrays, static greedy only
+                    -process - batch split between pool of processes, static greedy only
+                    -auto - the fastest one measured on random sample at the start of run, choice is reused
+                            by next runs with the same instance, population size and greedy settings
         """
         self.population_size = population_size
 
@@ -85,11 +200,29 @@ class Engine:
         self.survival_rate = survival_rate
 
         self.selection_method = selection_method
-        if selection_method == 'tournament':
+        if selection_method in ('tournament', 'steady'):
             if 'tournament_size' not in kwargs:
                 self.tournament_size = 15
             else:
                 self.tournament_size = kwargs['tournament_size']
+        if 'roulette_scaling' in kwargs:
+            self.roulette_scaling = kwargs['roulette_scaling']
+        else:
+            self.roulette_scaling = 'softmax'
+        if 'roulette_temperature' in kwargs:
+            self.roulette_temperature = kwargs['roulette_temperature']
+        else:
+            self.roulette_temperature = .1
+        if 'roulette_pressure' in kwargs:
+            self.roulette_pressure = kwargs['roulette_pressure']
+        else:
+            self.roulette_pressure = 1.5
+        if 'steady_batch' in kwargs:
+            self.steady_batch = kwargs['steady_batch']
+        else:
+            self.steady_batch = 2
+        self.steady_population = None
+        self.offspring = []
 
         self.crossover_method = crossover_method
 
@@ -105,9 +238,8 @@ class Engine:
                 self.greedy_type = kwargs['greedy_type']
             else:
                 self.greedy_type = 'static'
-            self.items = []
         elif knapsack_method == 'genetic':
-            self.items = None
+            pass
         else:
             print('Knapsack method error')
             exit(1)
@@ -117,7 +249,148 @@ class Engine:
         else:
             self.generations = 100
 
+        if 'avoid_duplicates' in kwargs:
+            self.avoid_duplicates = kwargs['avoid_duplicates']
+        else:
+            self.avoid_duplicates = False
+        if 'duplicate_retries' in kwargs:
+            self.duplicate_retries = kwargs['duplicate_retries']
+        else:
+            self.duplicate_retries = 5
+
+        if 'log_sink' in kwargs:
+            self.log_sink = kwargs['log_sink']
+        else:
+            self.log_sink = None
+        if 'log_percentiles' in kwargs:
+            self.log_percentiles = kwargs['log_percentiles']
+        else:
+            self.log_percentiles = False
+        if 'log_diversity' in kwargs:
+            self.log_diversity = kwargs['log_diversity']
+        else:
+            self.log_diversity = False
+        self.diversity = None
+
+        if 'checkpoint_file' in kwargs:
+            self.checkpoint_file = kwargs['checkpoint_file']
+        else:
+            self.checkpoint_file = None
+        if 'checkpoint_every' in kwargs:
+            self.checkpoint_every = kwargs['checkpoint_every']
+        else:
+            self.checkpoint_every = 50
+
+        if 'adaptive_operators' in kwargs:
+            self.adaptive_operators = kwargs['adaptive_operators']
+        else:
+            self.adaptive_operators = False
+        if 'operator_exploration' in kwargs:
+            self.operator_exploration = kwargs['operator_exploration']
+        else:
+            self.operator_exploration = .5
+        self.crossover_selector = None
+        self.mutation_selector = None
+        self.operator_stats = None
+
+        if 'time_limit' in kwargs:
+            self.time_limit = kwargs['time_limit']
+        else:
+            self.time_limit = None
+        if 'deadline' in kwargs:
+            self.deadline = kwargs['deadline']
+        else:
+            self.deadline = None
+        if 'best_callback' in kwargs:
+            self.best_callback = kwargs['best_callback']
+        else:
+            self.best_callback = None
+        self.children_limit = None
+        self.run_start = None
+        self.run_deadline = None
+        self.setup_deadline = None
+        self.best_lock = threading.Lock()
+        self.current_best = None
+        if 'max_evaluations' in kwargs:
+            self.max_evaluations = kwargs['max_evaluations']
+        else:
+            self.max_evaluations = None
+        if 'profile' in kwargs:
+            self.profile = kwargs['profile']
+        else:
+            self.profile = False
+        self.phase_times = dict()
+        self.evaluations = 0
+        self.generation = 0
+
+        self.path_evaluator = None
+        self.random_tours = None
+        self.random_fitness = None
+        self.batch_evaluations = 0
+
+        if 'fitness_store' in kwargs:
+            self.fitness_store = kwargs['fitness_store']
+        else:
+            self.fitness_store = None
+
+        if 'progress_callback' in kwargs:
+            self.progress_callback = kwargs['progress_callback']
+        else:
+            self.progress_callback = None
+
+        if 'metrics' in kwargs:
+            self.metrics = kwargs['metrics']
+        else:
+            self.metrics = None
+
+        if 'memory_limit' in kwargs:
+            self.memory_limit = kwargs['memory_limit']
+        else:
+            self.memory_limit = None
+        self.memory_peak = dict()
+        self.cache_evictions = 0
+        self.spill_sink = None
+
+        if 'memetic_top_k' in kwargs:
+            self.memetic_top_k = kwargs['memetic_top_k']
+        else:
+            self.memetic_top_k = 0
+        if 'memetic_time' in kwargs:
+            self.memetic_time = kwargs['memetic_time']
+        else:
+            self.memetic_time = .1
+        if 'memetic_neighbours' in kwargs:
+            self.memetic_neighbours = kwargs['memetic_neighbours']
+        else:
+            self.memetic_neighbours = 10
+        self.local_search = None
+        if 'mutation_neighbours' in kwargs:
+            self.mutation_neighbours = kwargs['mutation_neighbours']
+        else:
+            self.mutation_neighbours = 10
+        self.mutation_candidates = None
+
+        if 'seeding' in kwargs:
+            self.seeding = kwargs['seeding']
+        else:
+            self.seeding = None
+        if 'seeding_workers' in kwargs:
+            self.seeding_workers = kwargs['seeding_workers']
+        else:
+            self.seeding_workers = 1
+        self.seeding_time = 0
+        self.quality_trace = []
+
+        if 'evaluation_backend' in kwargs:
+            self.evaluation_backend = kwargs['evaluation_backend']
+        else:
+            self.evaluation_backend = 'object'
+        self.evaluator = None
+        # backends picked by auto selection, keys are instance hash, population size and greedy settings
+        self.backend_choices = dict()
+
         self.problem_name = None
+        self.instance_hash = None
         self.knapsack_data_type = None
         self.nodes_num = None
         self.items_num = None
@@ -127,21 +400,27 @@ class Engine:
         self.renting_ratio = None
         self.edge_weight_type = None
         self.nodes = []
+        self.items = None
+        self.spatial_index = None
+        self.distance_matrix = None
 
         self.population = []
         self.fitness_dict = dict()
         self.best_entity = None
 
-        self.logged_data = {'min': [], 'max': [], 'avg': []}
+        self.logged_data = {'min': [], 'max': [], 'avg': [], 'unique': [], 'distance': [], 'entropy': []}
+        self.logged_num = 0
 
     def run(self,
             generations=None,
             fitness=None,
             info_every=None,
-            visualize_result=False):
+            visualize_result=False,
+            resume=False):
         """
         Runs algorithm for n generations or until given fitness is met and plots data at the end
         If neither generations or fitness is given it will run forever
+        If checkpoint file is set, state is saved every checkpoint_every generations
 
         :param generations: int, optional
             Number of generations before algorithm will be terminated
@@ -151,17 +430,100 @@ class Engine:
             At every n-th generation information about number and fitness will be printed
         :param visualize_result: bool, optional
             If the best entity should be visualized after termination
+        :param resume: bool, optional
+            If run should be continued from checkpoint file, when it doesn't exist new run is started
+        :return: dict
+            Statistics of adaptive operators, also kept in operator_stats, None if adaptive operators are not used
         """
+        # time budget includes preparation of run
+        start_time = time.perf_counter()
+        self.run_start = start_time
+        self.run_deadline = None
+        if self.time_limit is not None:
+            self.run_deadline = start_time + self.time_limit
+        if self.deadline is not None:
+            end = start_time + self.deadline - time.time()
+            self.run_deadline = end if self.run_deadline is None else min(self.run_deadline, end)
+
+        # optional preparation steps stop or are skipped when their share of budget is used
+        self.setup_deadline = None
+        if self.run_deadline is not None:
+            self.setup_deadline = start_time + Engine.SETUP_SHARE * (self.run_deadline - start_time)
+
         if self.knapsack_method == 'greedy' and self.greedy_type == 'static':
             self.greedy_item_select()
 
+        self.evaluator = create_backend(self.evaluation_backend, self, self.setup_deadline)
+
+        self.local_search = None
+        if self.memetic_top_k > 0 and self.greedy_type == 'static' and self.selection_method != 'steady':
+            self.local_search = self.create_local_search()
+
+        self.mutation_candidates = None
+        if self.mutation_method == 'neighbour' or self.adaptive_operators:
+            self.mutation_candidates = self.spatial_index.neighbour_lists(self.mutation_neighbours)
+
         if generations is not None:
             self.generations = generations
         else:
             generations = self.generations
 
-        self.init()
-        generation = 0
+        if self.adaptive_operators:
+            self.crossover_selector = OperatorSelector(Genotype.CROSSOVERS, self.operator_exploration)
+            self.mutation_selector = OperatorSelector(Genotype.MUTATIONS, self.operator_exploration)
+
+        checkpoint = None
+        if self.checkpoint_file is not None:
+            checkpoint = Checkpoint(self.checkpoint_file)
+
+        self.diversity = EdgeCounter(self.nodes_num) if self.log_diversity else None
+
+        self.path_evaluator = None
+        self.random_fitness = None
+        self.batch_evaluations = 0
+        if self.selection_method == 'random' and self.greedy_type == 'static':
+            self.path_evaluator = self.create_path_evaluator()
+
+        if self.fitness_store is not None:
+            greedy = '{}:{}'.format(self.greedy_type, self.greedy_method)
+            self.fitness_dict = StoredFitnessDict(self.fitness_store, self.instance_hash, greedy, self.fitness_dict)
+
+        self.memory_peak = dict()
+        self.cache_evictions = 0
+
+        self.evaluations = 0
+        self.phase_times = dict()
+
+        self.children_limit = None
+        with self.best_lock:
+            self.current_best = None
+        # estimated time of creating and testing single child
+        child_time = None
+
+        # fitness values from previous runs are not counted in metrics
+        counted = (0, self.computed_fitness())
+
+        if resume and checkpoint is not None and checkpoint.exists():
+            generation, elapsed = checkpoint.load(self)
+            # time spent before interruption counts to time limit and to elapsed time of next checkpoints
+            self.run_start -= elapsed
+            if self.time_limit is not None:
+                self.run_deadline = min(self.run_deadline, self.run_start + self.time_limit)
+        else:
+            init_start = time.perf_counter()
+            self.init()
+            generation = 0
+            child_time = (time.perf_counter() - init_start) / len(self.population)
+            if len(self.population) < self.population_size:
+                # initialization was cut by deadline, there is no time left for generations
+                generations = 0
+        self.quality_trace = []
+        self.trace_quality(generation, start_time)
+        if self.metrics is not None:
+            counted = self.update_metrics(counted)
+        self.steady_population = None
+        if self.selection_method == 'steady':
+            self.steady_population = SteadyPopulation(self.population, self.diversity)
         while True:
             if info_every is not None and generation % info_every == 0:
                 print('Generation: {}\nFitness: {}'.format(
@@ -170,8 +532,35 @@ class Engine:
                 break
             if fitness is not None and self.population[0].fitness >= fitness:
                 break
+            if self.run_deadline is not None and not self.plan_generation(child_time):
+                break
+            if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+                break
+            generation_start = time.perf_counter()
+            evaluations = self.evaluations
             self.next_generation()
             generation += 1
+            if self.evaluations > evaluations:
+                estimate = (time.perf_counter() - generation_start) / (self.evaluations - evaluations)
+                child_time = estimate if child_time is None else (child_time + estimate) / 2
+            self.trace_quality(generation, start_time)
+            if self.metrics is not None:
+                self.metrics.inc('generations_total')
+                counted = self.update_metrics(counted)
+            if self.progress_callback is not None:
+                self.progress_callback(generation, self.population[0].fitness)
+            if checkpoint is not None and generation % self.checkpoint_every == 0:
+                checkpoint.save(self, generation)
+
+        self.generation = generation
+        self.operator_stats = self.operator_report() if self.adaptive_operators else None
+        self.children_limit = None
+        self.evaluator.close()
+        self.evaluator = None
+        if checkpoint is not None:
+            checkpoint.wait()
+        if self.fitness_store is not None:
+            self.fitness_store.flush()
 
         if visualize_result:
             best_fitness = self.population[
@@ -179,22 +568,214 @@ class Engine:
             print(
                 '{}\nAlgorithm terminated on generation: {}\nFinal fitness: {}'
                     .format(20 * '=', generation, best_fitness))
+            print('Peak memory: {} B'.format(self.memory_peak.get('total', 0)))
+            if self.operator_stats is not None:
+                print('Operators: {}'.format(self.operator_stats))
             self.visualize_best()
             self.plot_data()
 
+        return self.operator_stats
+
     def init(self):
         """
-        Initializes population with random entities
+        Initializes population with heuristic tours given by seeding and random entities
         """
-        self.population = [
-            Entity(self.nodes_num) for i in range(self.population_size)
-        ]
-        self.test()
-        self.sort()
+        self.population = []
+        self.seeding_time = 0
+        if self.seeding is not None and (self.setup_deadline is None or time.perf_counter() < self.setup_deadline):
+            start = time.perf_counter()
+            counts = {method: int(fraction * self.population_size) for method, fraction in self.seeding.items()}
+            for tour in Seeder(self.spatial_index).build(counts, self.seeding_workers, self.setup_deadline):
+                entity = Entity()
+                entity.genotype = Genotype()
+                entity.genotype.nodes_order = tour
+                self.population.append(entity)
+            del self.population[self.population_size:]
+            self.seeding_time = time.perf_counter() - start
+
+        if self.run_deadline is None:
+            self.population += [
+                Entity(self.nodes_num) for i in range(self.population_size - len(self.population))
+            ]
+            self.test()
+        else:
+            # random entities are created only for the next chunk, the first chunk is a single entity
+            # and the next ones are sized by its time, time of logging tested entities is kept in reserve,
+            # run ends after initialization if deadline is reached
+            tested = 0
+            chunk = 1
+            entity_time = None
+            key_time = None
+            while tested < self.population_size:
+                chunk_start = time.perf_counter()
+                end = min(tested + chunk, self.population_size)
+                self.population += [Entity(self.nodes_num) for i in range(end - len(self.population))]
+                self.test(self.population[tested:end])
+                estimate = (time.perf_counter() - chunk_start) / (end - tested)
+                entity_time = estimate if entity_time is None else (entity_time + estimate) / 2
+                key_start = time.perf_counter()
+                len({e.genotype.create_key() for e in self.population[tested:end]})
+                estimate = (time.perf_counter() - key_start) / (end - tested)
+                key_time = estimate if key_time is None else (key_time + estimate) / 2
+                tested = end
+                remaining = self.run_deadline - time.perf_counter() - Engine.LOG_RESERVE * tested * key_time
+                chunk = min(Engine.INIT_CHUNK, int(Engine.ANYTIME_SAFETY * remaining / entity_time)) \
+                    if entity_time > 0 else Engine.INIT_CHUNK
+                if chunk < 1:
+                    break
+            del self.population[tested:]
+        self.rank()
+        self.improve()
         if not self.keep_best:
             self.update_best()
         self.log_data()
 
+    def calculate_distances(self):
+        """
+        Calculates rows of distances between nodes, in time-budgeted run only until setup deadline
+
+        :return: list
+            Rows of distances, None if there was no time to calculate them
+        """
+        distances = self.distance_rows()
+        if distances is not None:
+            return distances
+
+        distances = []
+        for node in self.nodes:
+            if self.setup_deadline is not None and time.perf_counter() >= self.setup_deadline:
+                return None
+            distances.append([node.calculate_distance_to(n2) for n2 in self.nodes])
+
+        return distances
+
+    def create_local_search(self):
+        """
+        Prepares memetic local search
+
+        :return: LocalSearch
+            Local search, None if there was no time to calculate distances
+        """
+        distances = self.calculate_distances()
+        if distances is None:
+            return None
+
+        return LocalSearch(self.nodes, self.min_speed, self.max_speed, self.max_capacity, self.memetic_neighbours,
+                           self.spatial_index, distances)
+
+    def create_path_evaluator(self):
+        """
+        Prepares batch evaluation of random search
+
+        :return: PathEvaluator
+            Path evaluator, None if there was no time to calculate distances, entities are tested one by one then
+        """
+        distances = self.calculate_distances()
+        if distances is None:
+            return None
+
+        return PathEvaluator(self.nodes, self.min_speed, self.max_speed, self.max_capacity, distances)
+
+    def plan_generation(self, child_time):
+        """
+        Limits number of children of next generation to fit in remaining time of time-budgeted run
+
+        :param child_time: float
+            Estimated time of creating and testing single child in seconds, None if unknown
+        :return: bool
+            False if there is no time for next generation
+        """
+        remaining = self.run_deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+
+        self.children_limit = None
+        if child_time is not None and child_time > 0:
+            limit = int(Engine.ANYTIME_SAFETY * remaining / child_time)
+            if limit < 1:
+                return False
+            if limit < self.population_size:
+                self.children_limit = limit
+
+        return True
+
+    def best_so_far(self):
+        """
+        Reads the best solution of current run, can be called from other threads while engine is running
+
+        :return: tuple
+            Fitness and path, None if population wasn't tested yet
+        """
+        with self.best_lock:
+            if self.current_best is None:
+                return None
+            return self.current_best[0], list(self.current_best[1])
+
+    def trace_quality(self, generation, start_time):
+        """
+        Records time and number of evaluations when current best fitness was first reached,
+        updates the best solution available to other threads
+
+        :param generation: int
+            Number of generation
+        :param start_time: float
+            Value of time.perf_counter() at the start of run
+        """
+        fitness = self.population[0].fitness
+        if len(self.quality_trace) == 0 or fitness > self.quality_trace[-1][3]:
+            self.quality_trace.append((generation, round(time.perf_counter() - start_time, 4), self.evaluations,
+                                       fitness))
+            path = tuple(self.population[0].genotype.nodes_order)
+            with self.best_lock:
+                self.current_best = (fitness, path)
+            if self.best_callback is not None:
+                self.best_callback(fitness, list(path))
+
+    def computed_fitness(self):
+        """
+        Counts fitness values calculated in current run, values read from cache or fitness store are not counted
+
+        :return: int
+            Number of calculated values
+        """
+        computed = len(self.fitness_dict) + self.batch_evaluations + self.cache_evictions
+        if isinstance(self.fitness_dict, StoredFitnessDict):
+            computed -= self.fitness_dict.hits
+
+        return computed
+
+    def update_metrics(self, counted):
+        """
+        Adds evaluations done since last update to metrics, sets gauges and writes metrics if interval passed
+
+        :param counted: tuple
+            Number of evaluations and calculated fitness values already added
+        :return: tuple
+            Number of evaluations and calculated fitness values added so far
+        """
+        evaluations, computed = self.evaluations, self.computed_fitness()
+        self.metrics.inc('evaluations_total', evaluations - counted[0])
+        self.metrics.inc('fitness_computed_total', computed - counted[1])
+        self.metrics.set('best_fitness', self.population[0].fitness)
+        self.metrics.maybe_write()
+
+        return evaluations, computed
+
+    def time_to_quality(self, fitness):
+        """
+        Finds time when given fitness was reached in last run
+
+        :param fitness: float
+            Target fitness
+        :return: tuple
+            Generation, seconds and evaluations, None if target wasn't reached
+        """
+        for generation, seconds, evaluations, best in self.quality_trace:
+            if best >= fitness:
+                return generation, seconds, evaluations
+
+        return None
+
     def update_best(self):
         """
         Updates best found entity, used when best can be mutated/lost
@@ -203,25 +784,21 @@ class Engine:
             0].fitness:
             self.best_entity = self.population[0].copy()
 
-    def test(self):
+    def test(self, entities=None):
         """
         Calculates fitness for new entities in population
+
+        :param entities: list, optional
+            Entities to test instead of population
         """
-        for entity in self.population:
-            if entity.fitness is None:
-                if self.greedy_type == 'static':
-                    entity.test(self.nodes, self.min_speed, self.max_speed,
-                                self.max_capacity, self.fitness_dict,
-                                self.greedy_type)
-                else:
-                    entity.test(
-                        self.nodes,
-                        self.min_speed,
-                        self.max_speed,
-                        self.max_capacity,
-                        self.fitness_dict,
-                        self.greedy_type,
-                        greedy_method=self.greedy_method)
+        if self.evaluator is None:
+            self.evaluator = ObjectBackend(self)
+
+        if entities is None:
+            entities = self.population
+        entities = [e for e in entities if e.fitness is None]
+        self.evaluations += len(entities)
+        self.evaluator.evaluate(entities, self.fitness_dict)
 
     def sort(self):
         """
@@ -229,35 +806,303 @@ class Engine:
         """
         self.population.sort(key=lambda x: x.fitness, reverse=True)
 
+    def rank(self):
+        """
+        Partially sorts population, only entities required by later stages are placed at the beginning in order,
+        the rest of population is left unordered
+        Best entity is always first, with local search enabled memetic_top_k best entities are ordered
+        """
+        top_k = 1
+        if self.local_search is not None:
+            top_k = max(top_k, self.memetic_top_k)
+
+        if top_k >= len(self.population):
+            self.sort()
+        elif top_k == 1:
+            best_idx = max(range(len(self.population)), key=lambda i: self.population[i].fitness)
+            self.population[0], self.population[best_idx] = self.population[best_idx], self.population[0]
+        else:
+            top_idx = heapq.nlargest(top_k, range(len(self.population)), key=lambda i: self.population[i].fitness)
+            top_set = set(top_idx)
+            rest = [e for i, e in enumerate(self.population) if i not in top_set]
+            self.population = [self.population[i] for i in top_idx] + rest
+
     def next_generation(self):
         """
-        Procedes to next generation, selects new population, tests and sorts it
+        Procedes to next generation, selects new population, tests and ranks it
+        In steady-state mode only new children are tested and inserted
         """
-        self.selection()
-        self.test()
-        self.sort()
-        self.log_data()
+        if self.steady_population is not None:
+            self.run_phase('selection', self.selection)
+            self.run_phase('test', self.test_offspring)
+            self.run_phase('credit', self.credit_offspring)
+            self.run_phase('rank', self.replace_worst)
+            self.run_phase('log', self.log_steady)
+            self.run_phase('memory', self.check_memory)
+            return
+
+        self.run_phase('selection', self.selection)
+        self.run_phase('test', self.test)
+        self.run_phase('credit', self.credit_operators)
+        self.run_phase('rank', self.rank)
+        self.run_phase('improve', self.improve)
+        self.run_phase('log', self.log_data)
+        self.run_phase('memory', self.check_memory)
+
+    def check_memory(self):
+        """
+        Measures memory footprint, updates peak usage and enforces memory limit
+        """
+        footprint = engine_footprint(self)
+
+        if self.memory_limit is not None and sum(footprint.values()) > self.memory_limit:
+            # halving small cache would only lose values when population or buffers are over limit
+            if len(self.fitness_dict) > 0 and footprint['cache'] == max(footprint.values()):
+                # dictionary keeps insertion order, the oldest values are the first ones
+                newest = list(self.fitness_dict.items())[len(self.fitness_dict) // 2:]
+                self.cache_evictions += len(self.fitness_dict) - len(newest)
+                self.fitness_dict.clear()
+                dict.update(self.fitness_dict, newest)
+                footprint = engine_footprint(self)
+
+            if sum(footprint.values()) > self.memory_limit and self.log_sink is None:
+                self.spill_logs()
+                footprint = engine_footprint(self)
+
+        footprint['total'] = sum(footprint.values())
+        for name, size in footprint.items():
+            self.memory_peak[name] = max(self.memory_peak.get(name, 0), size)
+
+    def spill_logs(self):
+        """
+        Moves logged data to temporary file sink, next generations are logged there until the end of run
+        """
+        fd, path = tempfile.mkstemp(prefix='generations_', suffix='.log')
+        os.close(fd)
+        self.spill_sink = FileSink(path)
+        self.log_sink = self.spill_sink
+
+        data = self.logged_data
+        diversity = len(data['distance']) > 0
+        for num in range(len(data['min'])):
+            self.log_sink.write(GenerationRecord(num, data['min'][num], data['avg'][num], data['max'][num],
+                                                 data['unique'][num],
+                                                 distance=data['distance'][num] if diversity else math.nan,
+                                                 entropy=data['entropy'][num] if diversity else math.nan))
+
+        self.logged_data = {'min': [], 'max': [], 'avg': [], 'unique': [], 'distance': [], 'entropy': []}
+
+    def release_spill(self):
+        """
+        Drops records of temporary file sink, removes the file and logs to memory again
+        Spilled records have to be read from log_sink before
+        """
+        if self.spill_sink is None:
+            return
+
+        self.spill_sink.close()
+        self.spill_sink = None
+        # logs are spilled only when no sink was set
+        self.log_sink = None
+
+    def run_phase(self, name, phase):
+        """
+        Executes generation phase, measures its time if profiling is enabled
+
+        :param name: str
+            Name of the phase
+        :param phase: function
+            Phase to execute
+        """
+        if not self.profile:
+            phase()
+            return
+
+        start = time.perf_counter()
+        phase()
+        self.phase_times[name] = self.phase_times.get(name, 0) + time.perf_counter() - start
+
+    def credit_operators(self, entities=None):
+        """
+        Updates adaptive operator statistics with fitness of new children
+
+        :param entities: list, optional
+            Entities to credit instead of population
+        """
+        if not self.adaptive_operators:
+            return
+
+        for entity in entities if entities is not None else self.population:
+            if entity.origin is None:
+                continue
+
+            crossover, crossover_time, mutation, mutation_time, parent_fitness = entity.origin
+            improvement = entity.fitness - parent_fitness
+
+            self.crossover_selector.update(crossover, improvement, crossover_time)
+            if mutation is not None:
+                self.mutation_selector.update(mutation, improvement, mutation_time)
+
+            entity.origin = None
+
+    def operator_report(self):
+        """
+        Creates statistics of adaptive operators
+
+        :return: dict
+            Crossover and mutation statistics, None if adaptive operators are not used
+        """
+        if self.crossover_selector is None:
+            return None
+
+        return {'crossover': self.crossover_selector.report(),
+                'mutation': self.mutation_selector.report()}
+
+    def test_offspring(self):
+        """
+        Calculates fitness of steady-state children
+        """
+        self.test(self.offspring)
+
+    def credit_offspring(self):
+        """
+        Updates adaptive operator statistics with fitness of steady-state children
+        """
+        self.credit_operators(self.offspring)
+
+    def replace_worst(self):
+        """
+        Inserts steady-state children in place of the worst entities
+        """
+        for child in self.offspring:
+            self.steady_population.replace(child)
+        self.offspring = []
+
+    def improve(self):
+        """
+        Improves best entities with local search within time budget, then tests and sorts population again
+        """
+        if self.local_search is None:
+            return
+
+        deadline = time.perf_counter() + self.memetic_time
+        if self.run_deadline is not None:
+            deadline = min(deadline, self.run_deadline)
+        changed = False
+        for entity in self.population[:self.memetic_top_k]:
+            if time.perf_counter() >= deadline:
+                break
+            changed = self.local_search.improve(entity, deadline) or changed
+
+        if changed:
+            self.test()
+            self.rank()
 
     def log_data(self):
         """
-        Stores current generation max, min and avg fitness
+        Stores current generation max, min and avg fitness and ratio of unique paths,
+        with diversity logging also mean pairwise edge distance and edge entropy
+        Data is appended to logged_data or written to log sink if one is set
         """
+        n = self.nodes_num
         fitness_data = [e.fitness for e in self.population]
+        if self.random_fitness is not None:
+            # random search batch is not stored as entities
+            fitness_data.extend(self.random_fitness)
 
         min_fitness = min(fitness_data)
         max_fitness = max(fitness_data)
         avg_fitness = sum(fitness_data) / len(fitness_data)
 
-        self.logged_data['min'].append(round(min_fitness, 4))
-        self.logged_data['max'].append(round(max_fitness, 4))
-        self.logged_data['avg'].append(round(avg_fitness, 4))
+        distance = math.nan
+        entropy = math.nan
+        if self.diversity is not None:
+            paths = [e.genotype.create_key() for e in self.population]
+            if self.random_fitness is not None:
+                paths.extend(tuple(self.random_tours[i * n:(i + 1) * n]) for i in range(len(self.random_fitness)))
+            self.diversity.update(paths)
+            unique_ratio = self.diversity.unique() / len(paths)
+            distance = round(self.diversity.mean_distance(), 4)
+            entropy = round(self.diversity.entropy(), 4)
+        elif self.random_fitness is not None:
+            # tours of batch are compared as raw bytes, no tuple of node numbers is created for them
+            step = n * self.random_tours.itemsize
+            data = self.random_tours.tobytes()
+            paths = {data[i * step:(i + 1) * step] for i in range(len(self.random_fitness))}
+            paths.update(array.array('i', e.genotype.nodes_order).tobytes() for e in self.population)
+            unique_ratio = len(paths) / len(fitness_data)
+        else:
+            unique_ratio = len({e.genotype.create_key() for e in self.population}) / len(fitness_data)
+
+        self.write_log(min_fitness, avg_fitness, max_fitness, unique_ratio, distance, entropy, fitness_data)
+
+    def log_steady(self):
+        """
+        Stores statistics of steady-state population, values are maintained incrementally and percentiles are
+        not collected
+        """
+        min_fitness, avg_fitness, max_fitness, unique_ratio = self.steady_population.stats()
+
+        distance = math.nan
+        entropy = math.nan
+        if self.diversity is not None:
+            distance = round(self.diversity.mean_distance(), 4)
+            entropy = round(self.diversity.entropy(), 4)
+
+        self.write_log(min_fitness, avg_fitness, max_fitness, unique_ratio, distance, entropy)
+
+    def write_log(self, min_fitness, avg_fitness, max_fitness, unique_ratio, distance, entropy, fitness_data=None):
+        """
+        Appends generation statistics to logged_data or writes them to log sink
+
+        :param min_fitness: float
+            The worst fitness
+        :param avg_fitness: float
+            Mean fitness
+        :param max_fitness: float
+            The best fitness
+        :param unique_ratio: float
+            Ratio of unique paths
+        :param distance: float
+            Mean pairwise edge distance, nan if not collected
+        :param entropy: float
+            Edge entropy, nan if not collected
+        :param fitness_data: list, optional
+            Fitness of all entities, used for percentiles
+        """
+        if self.log_sink is not None:
+            record = GenerationRecord(self.logged_num, round(min_fitness, 4), round(avg_fitness, 4),
+                                      round(max_fitness, 4), round(unique_ratio, 4),
+                                      distance=distance, entropy=entropy)
+            if self.log_percentiles and fitness_data is not None:
+                fitness_data.sort()
+                last = len(fitness_data) - 1
+                record.p25 = fitness_data[int(.25 * last)]
+                record.p50 = fitness_data[int(.5 * last)]
+                record.p75 = fitness_data[int(.75 * last)]
+            self.log_sink.write(record)
+        else:
+            self.logged_data['min'].append(round(min_fitness, 4))
+            self.logged_data['max'].append(round(max_fitness, 4))
+            self.logged_data['avg'].append(round(avg_fitness, 4))
+            self.logged_data['unique'].append(round(unique_ratio, 4))
+            if self.diversity is not None:
+                self.logged_data['distance'].append(distance)
+                self.logged_data['entropy'].append(entropy)
+
+        self.logged_num += 1
 
     def clear_logs(self):
         """
         Clears collected data
         """
         self.fitness_dict = dict()
-        self.logged_data = {'min': [], 'max': [], 'avg': []}
+        self.logged_data = {'min': [], 'max': [], 'avg': [], 'unique': [], 'distance': [], 'entropy': []}
+        self.logged_num = 0
+        if self.spill_sink is not None:
+            self.release_spill()
+        elif self.log_sink is not None:
+            self.log_sink.clear()
 
     def reset_to_default(self):
         """
@@ -273,8 +1118,32 @@ class Engine:
         self.mutation_method = 'inverse'
         self.knapsack_method = 'greedy'
         self.tournament_size = 15
+        self.steady_batch = 2
+        self.roulette_scaling = 'softmax'
+        self.roulette_temperature = .1
+        self.roulette_pressure = 1.5
         self.generations = 100
         self.greedy_method = 'ratio'
+        self.avoid_duplicates = False
+        self.duplicate_retries = 5
+        self.adaptive_operators = False
+        self.log_percentiles = False
+        self.log_diversity = False
+        self.checkpoint_file = None
+        self.checkpoint_every = 50
+        self.operator_exploration = .5
+        self.time_limit = None
+        self.deadline = None
+        self.max_evaluations = None
+        self.profile = False
+        self.memory_limit = None
+        self.memetic_top_k = 0
+        self.memetic_time = .1
+        self.memetic_neighbours = 10
+        self.mutation_neighbours = 10
+        self.evaluation_backend = 'object'
+        self.seeding = None
+        self.seeding_workers = 1
 
         self.clear_logs()
 
@@ -282,9 +1151,17 @@ class Engine:
         """
         Plots logged data
         """
-        plt.plot(self.logged_data['min'], 'r')
-        plt.plot(self.logged_data['avg'], 'y')
-        plt.plot(self.logged_data['max'], 'g')
+        data = self.logged_data
+        if self.log_sink is not None:
+            data = {'min': [], 'max': [], 'avg': []}
+            for record in self.log_sink.records():
+                data['min'].append(record.min)
+                data['max'].append(record.max)
+                data['avg'].append(record.avg)
+
+        plt.plot(data['min'], 'r')
+        plt.plot(data['avg'], 'y')
+        plt.plot(data['max'], 'g')
 
         plt.xlabel('Generation')
         plt.ylabel('Fitness')
@@ -309,17 +1186,34 @@ class Engine:
             self.selection_tournament()
         elif self.selection_method == 'random':
             self.selection_random_search()
+        elif self.selection_method == 'steady':
+            self.selection_steady()
         else:
             print('Selection type error')
             exit(1)
 
+    def survivors_number(self):
+        """
+        Calculates number of entities passed to next generation without crossover, including best entity
+        In time-budgeted run it is increased so that number of children doesn't exceed children limit
+
+        :return: int
+            Number of survivors
+        """
+        survivors_num = int(self.survival_rate * self.population_size)
+        if self.children_limit is not None:
+            survivors_num = max(survivors_num, self.population_size - self.children_limit)
+
+        return survivors_num
+
     def selection_roulette(self):
         """
         Creates new population with weighted roulette system to pick parents
+        Weights are calculated once per generation and parents are drawn with alias method
         """
         new_population = []
 
-        survivors_num = int(self.survival_rate * self.population_size)
+        survivors_num = self.survivors_number()
         survivors_pool = self.population
         if self.keep_best:
             # passing best entity unchanged
@@ -332,38 +1226,175 @@ class Engine:
 
             new_population += survivors
 
-        weights = [e.fitness for e in self.population]
+        population_keys = None
+        if self.avoid_duplicates:
+            population_keys = {e.genotype.create_key() for e in new_population}
 
-        # softmax
-        # max for stability
-        max_w = max(weights)
-        norm_weights = [math.e ** (w - max_w) for w in weights]
+        fitness = [e.fitness for e in self.population]
+        if self.roulette_scaling == 'softmax':
+            weights = softmax_weights(fitness, self.roulette_temperature)
+        elif self.roulette_scaling == 'rank':
+            weights = rank_weights(fitness, self.roulette_pressure)
+        else:
+            print('Roulette scaling error')
+            exit(1)
 
-        denominator = sum(norm_weights)
-        for i in range(len(norm_weights)):
-            norm_weights[i] /= denominator
+        # all parents of generation are drawn at once
+        children_num = self.population_size - len(new_population)
+        parents = AliasTable(weights).sample(2 * children_num)
 
         # mating
-        while len(new_population) < self.population_size:
-            p1, p2 = random.choices(self.population, weights=norm_weights, k=2)
+        for k in range(children_num):
+            p1 = self.population[parents[2 * k]]
+            p2 = self.population[parents[2 * k + 1]]
 
-            child = p1.mate(p2, self.mutation_rate, self.crossover_method,
-                            self.mutation_method)
+            child = self.breed(p1, p2, population_keys)
             new_population.append(child)
 
         self.population = new_population
 
+    def breed(self, p1, p2, population_keys=None):
+        """
+        Creates child of given parents, if population keys are given duplicated child is mutated until it is unique
+        or retries limit is reached
+        With adaptive operators retries use mutation picked for child, or picked by selector if child wasn't mutated,
+        and their time is added to child origin, so the mutation is credited with the final child
+
+        :param p1: Entity
+            Parent 1
+        :param p2: Entity
+            Parent 2
+        :param population_keys: set, optional
+            Keys of entities already in new population, updated with child key
+        :return: Entity
+            Child
+        """
+        if self.adaptive_operators:
+            child = self.mate_adaptive(p1, p2)
+        else:
+            child = p1.mate(p2, self.mutation_rate, self.crossover_method,
+                            self.mutation_method, self.mutation_candidates)
+
+        if population_keys is not None:
+            key = child.genotype.create_key()
+            retries = 0
+            while key in population_keys and retries < self.duplicate_retries:
+                if self.adaptive_operators:
+                    crossover, crossover_time, mutation, mutation_time, parent_fitness = child.origin
+                    if mutation is None:
+                        mutation = self.mutation_selector.select()
+                    start = time.process_time()
+                    child.genotype.mutate(method=mutation, neighbours=self.mutation_candidates)
+                    mutation_time += time.process_time() - start
+                    child.origin = (crossover, crossover_time, mutation, mutation_time, parent_fitness)
+                else:
+                    child.genotype.mutate(method=self.mutation_method, neighbours=self.mutation_candidates)
+                key = child.genotype.create_key()
+                retries += 1
+            population_keys.add(key)
+
+        return child
+
+    def mate_adaptive(self, p1, p2):
+        """
+        Creates child with operators picked by selectors, stores picked operators and their time in child origin
+
+        :param p1: Entity
+            Parent 1
+        :param p2: Entity
+            Parent 2
+        :return: Entity
+            Child
+        """
+        crossover = self.crossover_selector.select()
+        start = time.process_time()
+        child_genotype = p1.genotype.crossover(p2.genotype, method=crossover)
+        crossover_time = time.process_time() - start
+
+        mutation = None
+        mutation_time = 0
+        if random.random() < self.mutation_rate:
+            mutation = self.mutation_selector.select()
+            start = time.process_time()
+            child_genotype.mutate(method=mutation, neighbours=self.mutation_candidates)
+            mutation_time = time.process_time() - start
+
+        child = Entity()
+        child.genotype = child_genotype
+        child.origin = (crossover, crossover_time, mutation, mutation_time, max(p1.fitness, p2.fitness))
+
+        return child
+
     def selection_random_search(self):
         """
         Simulates random search
+
+        With static items random paths are generated in place in preallocated array and evaluated in batch,
+        only path better than current best is turned into entity
+        """
+        if self.path_evaluator is None:
+            size = self.population_size
+            if self.children_limit is not None:
+                size = min(size, self.children_limit + 1)
+            new_population = [
+                Entity(self.nodes_num) for i in range(size)
+            ]
+            new_population[0] = self.population[0]
+
+            self.population = new_population
+            return
+
+        n = self.nodes_num
+        batch_size = self.population_size - 1
+        if self.children_limit is not None:
+            batch_size = min(batch_size, self.children_limit)
+        if self.random_tours is None or len(self.random_tours) != batch_size * n:
+            self.random_tours = array.array('i', range(n)) * batch_size
+            self.random_fitness = array.array('d', bytes(8 * batch_size))
+        elif self.random_fitness is None:
+            self.random_fitness = array.array('d', bytes(8 * batch_size))
+
+        tours = memoryview(self.random_tours)
+        for i in range(batch_size):
+            random.shuffle(tours[i * n:(i + 1) * n])
+
+        self.path_evaluator.evaluate_batch(self.random_tours, n, self.random_fitness)
+        self.evaluations += batch_size
+        self.batch_evaluations += batch_size
+
+        best = self.population[0]
+        best_idx = max(range(batch_size), key=self.random_fitness.__getitem__)
+        if self.random_fitness[best_idx] > best.fitness:
+            best = Entity()
+            best.genotype = Genotype()
+            best.genotype.nodes_order = self.random_tours[best_idx * n:(best_idx + 1) * n].tolist()
+            best.fitness = self.random_fitness[best_idx]
+
+        self.population = [best]
+
+    def selection_steady(self):
+        """
+        Creates steady_batch children with parents picked by tournaments, population is not changed
+        With avoid_duplicates children already present in population are mutated again
         """
+        tournament_size = min(self.tournament_size, len(self.population))
 
-        new_population = [
-            Entity(self.nodes_num) for i in range(self.population_size)
-        ]
-        new_population[0] = self.population[0]
+        children_num = self.steady_batch
+        if self.children_limit is not None:
+            children_num = min(children_num, self.children_limit)
 
-        self.population = new_population
+        self.offspring = []
+        while len(self.offspring) < children_num:
+            p1 = max(random.sample(self.population, tournament_size), key=lambda x: x.fitness)
+            p2 = max(random.sample(self.population, tournament_size), key=lambda x: x.fitness)
+
+            child = self.breed(p1, p2)
+            if self.avoid_duplicates:
+                retries = 0
+                while child.genotype.create_key() in self.steady_population and retries < self.duplicate_retries:
+                    child.genotype.mutate(method=self.mutation_method, neighbours=self.mutation_candidates)
+                    retries += 1
+            self.offspring.append(child)
 
     def selection_tournament(self):
         """
@@ -371,7 +1402,7 @@ class Engine:
         """
         new_population = []
 
-        survivors_num = int(self.survival_rate * self.population_size)
+        survivors_num = self.survivors_number()
         survivors_pool = self.population
         if self.keep_best:
             # passing best entity unchanged
@@ -384,6 +1415,10 @@ class Engine:
 
             new_population += survivors
 
+        population_keys = None
+        if self.avoid_duplicates:
+            population_keys = {e.genotype.create_key() for e in new_population}
+
         while len(new_population) < self.population_size:
             # select parents from 2 random tournaments
             p1 = max(
@@ -393,8 +1428,7 @@ class Engine:
                 random.sample(self.population, self.tournament_size),
                 key=lambda x: x.fitness)
 
-            child = p1.mate(p2, self.mutation_rate, self.crossover_method,
-                            self.mutation_method)
+            child = self.breed(p1, p2, population_keys)
             new_population.append(child)
 
         self.population = new_population
@@ -409,20 +1443,26 @@ class Engine:
             ratio - best value/weight ratio first
         """
         if self.greedy_method == 'weight':
-            self.items.sort(key=lambda x: x.weight)
+            criteria = self.items.weights
+            reverse = False
         elif self.greedy_method == 'value':
-            self.items.sort(key=lambda x: x.value, reverse=True)
+            criteria = self.items.values
+            reverse = True
         elif self.greedy_method == 'ratio':
-            self.items.sort(key=lambda x: x.ratio, reverse=True)
+            criteria = self.items.ratios
+            reverse = True
         else:
             print('Greedy method error')
             exit(1)
 
+        order = sorted(self.items.input_order, key=criteria.__getitem__, reverse=reverse)
+
+        self.items.clear_marks()
         weight_left = self.max_capacity
-        for item in self.items:
-            if item.weight <= weight_left:
-                item.to_steal = True
-                weight_left -= item.weight
+        for i in order:
+            if self.items.weights[i] <= weight_left:
+                self.items.selected[i] = 1
+                weight_left -= self.items.weights[i]
                 if weight_left == 0:
                     break
 
@@ -437,6 +1477,8 @@ class Engine:
         with open(data_path) as f:
             lines = list(f)
 
+        self.instance_hash = hashlib.sha1(''.join(lines).encode()).hexdigest()
+
         self.problem_name = lines[0].split(':')[1].replace('\t', '').replace(
             '\n', '')
         self.knapsack_data_type = lines[1].split(':')[1].replace('\t',
@@ -465,19 +1507,55 @@ class Engine:
         item_lines = lines[self.nodes_num + 11:self.nodes_num +
                                                self.items_num + 11]
 
-        for node_line in node_lines:
+        items = []
+        for item_line in item_lines:
+            _, profit, weight, node = item_line.split()
+
+            node_id = int(node) - 1
+            items.append((int(profit), int(weight), node_id))
+
+        self.items = ItemTable(self.nodes_num, items)
+
+        for node_id, node_line in enumerate(node_lines):
             _, x, y = node_line.split()
 
-            node = Node(float(x), float(y))
+            node = Node(float(x), float(y), self.items, node_id)
             self.nodes.append(node)
 
-        for item_line in item_lines:
-            _, profit, weight, node = item_line.split()
+        self.spatial_index = KDTree([node.position for node in self.nodes])
 
-            item = Item(int(profit), int(weight))
+    def distance_rows(self):
+        """
+        Splits shared distance matrix into rows without copying
 
-            if self.items is not None:
-                self.items.append(item)
+        :return: list
+            List of rows, None if distance matrix is not set
+        """
+        if self.distance_matrix is None:
+            return None
 
-            node_id = int(node) - 1
-            self.nodes[node_id].add_item(item)
+        n = self.nodes_num
+        return [self.distance_matrix[i * n:(i + 1) * n] for i in range(n)]
+
+    def share_data(self, engine):
+        """
+        Uses problem data already loaded by another engine without copying it
+
+        :param engine: Engine
+            Engine with loaded data
+        """
+        self.problem_name = engine.problem_name
+        self.instance_hash = engine.instance_hash
+        self.knapsack_data_type = engine.knapsack_data_type
+        self.nodes_num = engine.nodes_num
+        self.items_num = engine.items_num
+        self.max_capacity = engine.max_capacity
+        self.min_speed = engine.min_speed
+        self.max_speed = engine.max_speed
+        self.renting_ratio = engine.renting_ratio
+        self.edge_weight_type = engine.edge_weight_type
+        self.nodes = engine.nodes
+        self.items = engine.items
+        self.spatial_index = engine.spatial_index
+        self.distance_matrix = engine.distance_matrix
+        self.backend_choices = engine.backend_choices
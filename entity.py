@@ -1,3 +1,4 @@
+import array
 from random import random
 
 import networkx as nx
@@ -12,6 +13,7 @@ class Entity:
 
     genotype - Encoded path
     fitness - Score of this path
+    origin - Operators which created entity and their cost, used by adaptive operator selection
     """
 
     def __init__(self, nodes_num=None):
@@ -21,6 +23,7 @@ class Entity:
         """
         self.genotype = None if nodes_num is None else Genotype(nodes_num)
         self.fitness = None
+        self.origin = None
 
     def copy(self):
         """
@@ -111,6 +114,8 @@ class Entity:
         :param greedy_method: str, optional
             Criteria by which items are marked
         """
+        table = nodes[path[0][0]].table
+
         # build distance, items list
         distances = []
         total_distance = 0
@@ -119,7 +124,7 @@ class Entity:
             node2 = nodes[id2]
 
             distance = node1.calculate_distance_to(node2)
-            items = node1.items
+            items = node1.item_ids()
 
             total_distance += distance
 
@@ -134,22 +139,20 @@ class Entity:
         for pair in distances:
             pair[1] = 1 - (pair[1] / total_distance) + 1
 
-        # create item, weighted value list
+        # create item id, weighted value list
+        if greedy_method == 'ratio':
+            criteria = table.ratios
+        elif greedy_method == 'weight':
+            criteria = table.weights
+        else:
+            criteria = table.values
+
         scaled_items = []
-        for pair in distances:
-            for item in pair[0]:
-                value = None
-                if greedy_method == 'ratio':
-                    value = item.ratio
-                    value *= pair[1]
-                elif greedy_method == 'weight':
-                    value = item.weight
-                    value *= (-2 - pair[1])
-                elif greedy_method == 'value':
-                    value = item.value
-                    value *= pair[1]
-
-                scaled_items.append((item, value))
+        for items, scale in distances:
+            if greedy_method == 'weight':
+                scale = -2 - scale
+            for i in items:
+                scaled_items.append((i, criteria[i] * scale))
 
         # sort
         if greedy_method == 'ratio':
@@ -159,16 +162,25 @@ class Entity:
         elif greedy_method == 'value':
             scaled_items.sort(key=lambda x: x[1], reverse=True)
 
-        # greedy mark items
+        # greedy mark items and sum stolen items in nodes
+        stolen_values = array.array('q', bytes(len(table.stolen_values) * 8))
+        stolen_weights = array.array('q', bytes(len(table.stolen_weights) * 8))
+        nodes_ids = table.nodes
+        weights = table.weights
         weight_left = max_weight
-        for item, _ in scaled_items:
-            if item.weight <= weight_left:
-                item.to_steal = True
-                weight_left -= item.weight
+        for i, _ in scaled_items:
+            if weights[i] <= weight_left:
+                table.selected[i] = 1
+                weight_left -= weights[i]
+                stolen_values[nodes_ids[i]] += table.values[i]
+                stolen_weights[nodes_ids[i]] += weights[i]
             else:
-                item.to_steal = False
+                table.selected[i] = 0
+        table.stolen_values = stolen_values
+        table.stolen_weights = stolen_weights
+        table.changed = False
 
-    def mate(self, entity, mutation_rate=.01, crossover_method='simple', mutation_method='swap'):
+    def mate(self, entity, mutation_rate=.01, crossover_method='simple', mutation_method='swap', neighbours=None):
         """
         Creates child with second entity
 
@@ -180,6 +192,8 @@ class Entity:
             Crossover method
         :param mutation_method: str, optional
             Mutation method
+        :param neighbours: list, optional
+            List of nearest nodes ids for every node, required by neighbour mutation
         :return: Entity
             Child
         """
@@ -192,7 +206,7 @@ class Entity:
         # mutation
         rnd = random()
         if rnd < mutation_rate:
-            child_genotype.mutate(method=mutation_method)
+            child_genotype.mutate(method=mutation_method, neighbours=neighbours)
 
         child = Entity()
         child.genotype = child_genotype
@@ -239,28 +253,50 @@ class Node:
     Node representing city
 
     position - Coordinates of the city
-    items - Items available in the city
+    table - Table with items of all cities
+    index - Id of the city
     """
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, table=None, index=None):
         """
         :param x: float
             X coordinate of node
         :param y: float
             Y coordinate of node
+        :param table: ItemTable, optional
+            Table with items of all cities
+        :param index: int, optional
+            Id of the city in table
         """
         self.position = (x, y)
-        self.items = []
+        self.table = table
+        self.index = index
         self.sort_order = None
 
-    def add_item(self, item):
+    @property
+    def items(self):
+        """
+        Views of items available in the city
+
+        :return: list
+            List of Item
         """
-        Inserts new item to node
+        if self.table is None:
+            return []
 
-        :param item: Item
-            New item
+        return [Item(self.table, i) for i in self.item_ids()]
+
+    def item_ids(self):
+        """
+        Ids of items available in the city
+
+        :return: range
+            Range of item ids in table
         """
-        self.items.append(item)
+        if self.table is None:
+            return range(0)
+
+        return self.table.node_items(self.index)
 
     def calculate_distance_to(self, node):
         """
@@ -302,19 +338,15 @@ class Node:
         :return: tuple
             Value of stolen items, weight of stolen items
         """
-        value = 0
-        weight = 0
-        for item in self.items:
-            if item.to_steal:
-                value += item.value
-                weight += item.weight
+        if self.table is None:
+            return 0, 0
 
-        return value, weight
+        return self.table.steal(self.index)
 
 
 class Item:
     """
-    Item
+    View of single item stored in item table
 
     value - Value of the item
     weight - Weight of the item
@@ -322,14 +354,182 @@ class Item:
     to_steal - If item will be picked
     """
 
-    def __init__(self, value, weight):
+    def __init__(self, table, index):
+        """
+        :param table: ItemTable
+            Table storing the item
+        :param index: int
+            Id of the item in table
         """
-        :param value: int
-            Value of item
-        :param weight: int
-            Weight of item
+        self.table = table
+        self.index = index
+
+    @property
+    def value(self):
         """
-        self.value = value
-        self.weight = weight
-        self.ratio = value / weight
-        self.to_steal = False
+        Value of the item
+        """
+        return self.table.values[self.index]
+
+    @property
+    def weight(self):
+        """
+        Weight of the item
+        """
+        return self.table.weights[self.index]
+
+    @property
+    def ratio(self):
+        """
+        Value/weight ratio
+        """
+        return self.table.ratios[self.index]
+
+    @property
+    def to_steal(self):
+        """
+        If item will be picked
+        """
+        return self.table.selected[self.index] == 1
+
+    @to_steal.setter
+    def to_steal(self, flag):
+        self.table.selected[self.index] = 1 if flag else 0
+        self.table.changed = True
+
+
+class ItemTable:
+    """
+    Columnar storage of all items, items are grouped by node
+
+    values - Value of every item
+    weights - Weight of every item
+    nodes - Node id of every item
+    ratios - Value/weight ratio of every item
+    selected - Mask of items to steal
+    offsets - Items of node i have ids from offsets[i] to offsets[i + 1]
+    input_order - Item ids in order in which items were given
+    stolen_values - Value of marked items in every node
+    stolen_weights - Weight of marked items in every node
+    changed - If mask changed since stolen sums were calculated
+    """
+
+    def __init__(self, nodes_num, items):
+        """
+        :param nodes_num: int
+            Total number of nodes
+        :param items: list
+            List of (value, weight, node id) tuples
+        """
+        # group items by node, keep input order inside node
+        sorted_ids = sorted(range(len(items)), key=lambda i: items[i][2])
+        self.input_order = array.array('i', [0] * len(items))
+        for table_id, input_id in enumerate(sorted_ids):
+            self.input_order[input_id] = table_id
+        items = [items[i] for i in sorted_ids]
+
+        self.values = array.array('q', [i[0] for i in items])
+        self.weights = array.array('q', [i[1] for i in items])
+        self.nodes = array.array('i', [i[2] for i in items])
+        self.ratios = array.array('d', [i[0] / i[1] for i in items])
+        self.selected = bytearray(len(items))
+
+        self.offsets = array.array('i', [0] * (nodes_num + 1))
+        for node_id in self.nodes:
+            self.offsets[node_id + 1] += 1
+        for i in range(nodes_num):
+            self.offsets[i + 1] += self.offsets[i]
+
+        self.stolen_values = array.array('q', [0] * nodes_num)
+        self.stolen_weights = array.array('q', [0] * nodes_num)
+        self.changed = False
+
+    @classmethod
+    def from_columns(cls, values, weights, nodes, ratios, offsets, input_order):
+        """
+        Creates table over existing item columns without copying them, only mask and stolen sums are allocated
+
+        :param values: sequence
+            Value of every item, grouped by node
+        :param weights: sequence
+            Weight of every item
+        :param nodes: sequence
+            Node id of every item
+        :param ratios: sequence
+            Value/weight ratio of every item
+        :param offsets: sequence
+            Items of node i have ids from offsets[i] to offsets[i + 1]
+        :param input_order: sequence
+            Item ids in order in which items were given
+        :return: ItemTable
+            Table
+        """
+        table = cls.__new__(cls)
+        table.values = values
+        table.weights = weights
+        table.nodes = nodes
+        table.ratios = ratios
+        table.offsets = offsets
+        table.input_order = input_order
+        table.selected = bytearray(len(values))
+
+        nodes_num = len(offsets) - 1
+        table.stolen_values = array.array('q', [0] * nodes_num)
+        table.stolen_weights = array.array('q', [0] * nodes_num)
+        table.changed = False
+
+        return table
+
+    def __len__(self):
+        """
+        Number of items
+        """
+        return len(self.values)
+
+    def node_items(self, node_id):
+        """
+        Ids of items in given node
+
+        :param node_id: int
+            Id of node
+        :return: range
+            Range of item ids
+        """
+        return range(self.offsets[node_id], self.offsets[node_id + 1])
+
+    def clear_marks(self):
+        """
+        Unmarks all items
+        """
+        self.selected = bytearray(len(self.values))
+        self.changed = True
+
+    def update_stolen(self):
+        """
+        Recalculates value and weight of marked items in every node
+        """
+        for node_id in range(len(self.stolen_values)):
+            value = 0
+            weight = 0
+            for i in range(self.offsets[node_id], self.offsets[node_id + 1]):
+                if self.selected[i]:
+                    value += self.values[i]
+                    weight += self.weights[i]
+            self.stolen_values[node_id] = value
+            self.stolen_weights[node_id] = weight
+
+        self.changed = False
+
+    def steal(self, node_id):
+        """
+        Steals marked items from given node
+
+        :param node_id: int
+            Id of node
+        :return: tuple
+            Value of stolen items, weight of stolen items
+        """
+        if self.changed:
+            self.update_stolen()
+
+        return self.stolen_values[node_id], self.stolen_weights[node_id]
@@ -0,0 +1,486 @@
+import array
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+from entity import Entity
+from genetics import Genotype
+
+
+class PathEvaluator:
+    """
+    Evaluates paths stored in flat integer arrays without creating entities
+
+    Works only with statically marked items, gives the same values as Entity.test.
+
+    distances - Rows of distances between nodes
+    values - Value of items stolen in every node
+    weights - Weight of items stolen in every node
+    min_speed - Minimal speed
+    max_speed - Maximal speed
+    max_weight - Capacity of knapsack
+    """
+
+    def __init__(self, nodes, min_speed, max_speed, max_weight, distances=None):
+        """
+        :param nodes: list
+            List of all nodes, items have to be already marked
+        :param min_speed: float
+            Speed with full bag
+        :param max_speed: float
+            Speed with empty bag
+        :param max_weight: int
+            Capacity of bag
+        :param distances: list, optional
+            Rows of already calculated distances, calculated from nodes if not given
+        """
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.max_weight = max_weight
+
+        if distances is not None:
+            self.distances = distances
+        else:
+            self.distances = [array.array('d', [n1.calculate_distance_to(n2) for n2 in nodes]) for n1 in nodes]
+        stolen = [node.steal() for node in nodes]
+        self.values = [value for value, _ in stolen]
+        self.weights = [weight for _, weight in stolen]
+
+    def evaluate(self, tours, start, nodes_num):
+        """
+        Calculates fitness of single path
+
+        :param tours: array
+            Flat array of paths
+        :param start: int
+            Index of the first node of path
+        :param nodes_num: int
+            Number of nodes
+        :return: float
+            Fitness
+        """
+        distances = self.distances
+        values = self.values
+        weights = self.weights
+        max_speed = self.max_speed
+        speed_range = self.max_speed - self.min_speed
+        max_weight = self.max_weight
+
+        path = tours[start:start + nodes_num]
+        next_nodes = itertools.chain(itertools.islice(path, 1, None), (path[0],))
+
+        fitness = 0
+        weight = 0
+        for id1, id2 in zip(path, next_nodes):
+            weight += weights[id1]
+            speed = max_speed - weight * speed_range / max_weight
+
+            fitness += values[id1]
+            fitness -= distances[id1][id2] / speed
+
+        return fitness
+
+    def evaluate_batch(self, tours, nodes_num, fitness):
+        """
+        Calculates fitness of all paths in flat array
+
+        :param tours: array
+            Flat array of paths, path i starts at i * nodes_num
+        :param nodes_num: int
+            Number of nodes
+        :param fitness: array
+            Output array of fitness values, one for every path
+        """
+        for i in range(len(fitness)):
+            fitness[i] = self.evaluate(tours, i * nodes_num, nodes_num)
+
+
+def split_cached(entities, fitness_dict):
+    """
+    Reads already known fitness values and groups the rest of entities by path
+
+    :param entities: list
+        Entities without fitness
+    :param fitness_dict: dict
+        Dictionary mapping genes sequence -> fitness value
+    :return: dict
+        Dictionary mapping genes sequence -> list of entities with this path, only for paths not in fitness_dict
+    """
+    pending = dict()
+    for entity in entities:
+        key = entity.genotype.create_key()
+        if key in pending:
+            pending[key].append(entity)
+        elif key in fitness_dict:
+            entity.fitness = fitness_dict[key]
+        else:
+            pending[key] = [entity]
+
+    return pending
+
+
+class ObjectBackend:
+    """
+    Reference evaluation with Entity.test on node objects, works with all item selection settings
+    """
+    name = 'object'
+    static_only = False
+
+    def __init__(self, engine):
+        """
+        :param engine: Engine
+            Engine with loaded data
+        """
+        self.engine = engine
+
+    def evaluate(self, entities, fitness_dict):
+        """
+        Calculates fitness of entities
+
+        :param entities: list
+            Entities without fitness
+        :param fitness_dict: dict
+            Dictionary mapping genes sequence -> fitness value, updated with new values
+        """
+        engine = self.engine
+        for entity in entities:
+            if engine.greedy_type == 'static':
+                entity.test(engine.nodes, engine.min_speed, engine.max_speed,
+                            engine.max_capacity, fitness_dict,
+                            engine.greedy_type)
+            else:
+                entity.test(engine.nodes, engine.min_speed, engine.max_speed,
+                            engine.max_capacity, fitness_dict,
+                            engine.greedy_type,
+                            greedy_method=engine.greedy_method)
+
+    def close(self):
+        """
+        Releases resources of backend
+        """
+        pass
+
+
+class BatchBackend:
+    """
+    Evaluation of all new paths of generation at once with PathEvaluator over flat arrays
+    Items have to be statically marked before backend is created
+    """
+    name = 'batch'
+    static_only = True
+
+    def __init__(self, engine):
+        """
+        :param engine: Engine
+            Engine with loaded data and marked items
+        """
+        self.nodes_num = engine.nodes_num
+        self.evaluator = PathEvaluator(engine.nodes, engine.min_speed, engine.max_speed, engine.max_capacity,
+                                       engine.distance_rows())
+
+    def evaluate(self, entities, fitness_dict):
+        """
+        Calculates fitness of entities
+
+        :param entities: list
+            Entities without fitness
+        :param fitness_dict: dict
+            Dictionary mapping genes sequence -> fitness value, updated with new values
+        """
+        pending = split_cached(entities, fitness_dict)
+        if len(pending) == 0:
+            return
+
+        tours = array.array('i')
+        for key in pending:
+            tours.extend(key)
+        fitness = array.array('d', bytes(8 * len(pending)))
+
+        self.evaluate_tours(tours, fitness)
+
+        for (key, group), value in zip(pending.items(), fitness):
+            fitness_dict[key] = value
+            for entity in group:
+                entity.fitness = value
+
+    def evaluate_tours(self, tours, fitness):
+        """
+        Calculates fitness of paths in flat array
+
+        :param tours: array
+            Flat array of paths
+        :param fitness: array
+            Output array of fitness values
+        """
+        self.evaluator.evaluate_batch(tours, self.nodes_num, fitness)
+
+    def close(self):
+        """
+        Releases resources of backend
+        """
+        pass
+
+
+# evaluator of process pool worker, set by pool initializer
+worker_evaluator = None
+
+
+def init_worker(evaluator):
+    """
+    Stores evaluator in pool worker
+
+    :param evaluator: PathEvaluator
+        Evaluator with problem data
+    """
+    global worker_evaluator
+    worker_evaluator = evaluator
+
+
+def evaluate_chunk(chunk):
+    """
+    Calculates fitness of paths in pool worker
+
+    :param chunk: tuple
+        Bytes of flat path array and number of nodes
+    :return: bytes
+        Bytes of fitness array
+    """
+    data, nodes_num = chunk
+    tours = array.array('i')
+    tours.frombytes(data)
+    fitness = array.array('d', bytes(8 * (len(tours) // nodes_num)))
+    worker_evaluator.evaluate_batch(tours, nodes_num, fitness)
+
+    return fitness.tobytes()
+
+
+class ProcessBackend(BatchBackend):
+    """
+    Batch evaluation split between pool of processes, every worker keeps its own copy of evaluator
+    Items have to be statically marked before backend is created
+    """
+    name = 'process'
+    static_only = True
+
+    def __init__(self, engine, workers=None):
+        """
+        :param engine: Engine
+            Engine with loaded data and marked items
+        :param workers: int, optional
+            Number of processes, defaults to number of CPUs
+        """
+        super().__init__(engine)
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        self.pool = context.Pool(self.workers, initializer=init_worker, initargs=(self.evaluator,))
+
+    def evaluate_tours(self, tours, fitness):
+        """
+        Calculates fitness of paths in flat array, paths are split into one chunk per worker
+
+        :param tours: array
+            Flat array of paths
+        :param fitness: array
+            Output array of fitness values
+        """
+        n = self.nodes_num
+        count = len(fitness)
+        chunk_size = -(-count // self.workers)
+        chunks = [(tours[i * n:(i + chunk_size) * n].tobytes(), n) for i in range(0, count, chunk_size)]
+
+        results = array.array('d')
+        for data in self.pool.map(evaluate_chunk, chunks):
+            results.frombytes(data)
+        fitness[:] = results
+
+    def close(self):
+        """
+        Stops worker processes
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+
+BACKENDS = {'object': ObjectBackend, 'batch': BatchBackend, 'process': ProcessBackend}
+# number of sampled paths evaluated at once when benchmark has deadline
+SAMPLE_CHUNK = 8
+
+
+def register_backend(backend_class):
+    """
+    Adds evaluation backend to registry
+
+    Backend class is created with engine, has name and static_only attributes and evaluate(entities, fitness_dict)
+    and close() methods.
+
+    :param backend_class: class
+        Backend class
+    """
+    BACKENDS[backend_class.name] = backend_class
+
+
+def available_backends(engine):
+    """
+    Lists backends usable with engine settings
+
+    :param engine: Engine
+        Engine with loaded data
+    :return: list
+        Names of backends
+    """
+    static = engine.knapsack_method == 'greedy' and engine.greedy_type == 'static'
+    names = []
+    for name, backend_class in BACKENDS.items():
+        if backend_class.static_only and not static:
+            continue
+        if name == 'process' and multiprocessing.current_process().daemon:
+            # daemonic pool workers can't have children
+            continue
+        names.append(name)
+
+    return names
+
+
+def sample_entities(nodes_num, size, seed=0):
+    """
+    Creates random entities without changing state of global random generator
+
+    :param nodes_num: int
+        Number of nodes
+    :param size: int
+        Number of entities
+    :param seed: int, optional
+        Seed of sample
+    :return: list
+        Entities without fitness
+    """
+    rng = random.Random(seed)
+    entities = []
+    for _ in range(size):
+        entity = Entity()
+        entity.genotype = Genotype()
+        entity.genotype.nodes_order = list(range(nodes_num))
+        rng.shuffle(entity.genotype.nodes_order)
+        entities.append(entity)
+
+    return entities
+
+
+def select_backend(engine, sample_size=None, deadline=None):
+    """
+    Measures evaluation time of every available backend on random sample and picks the fastest one
+
+    With deadline the sample is evaluated in chunks of SAMPLE_CHUNK paths and benchmark stops when deadline passes,
+    time of partially evaluated sample is extrapolated and backends not started before deadline are not measured.
+
+    :param engine: Engine
+        Engine with loaded data, items have to be marked for static greedy
+    :param sample_size: int, optional
+        Number of sampled paths, defaults to population size
+    :param deadline: float, optional
+        Value of time.perf_counter() when benchmark should stop
+    :return: tuple
+        Created backend and dictionary mapping backend name -> time in seconds
+    """
+    if sample_size is None:
+        sample_size = engine.population_size
+    chunk = sample_size if deadline is None else SAMPLE_CHUNK
+
+    best = None
+    times = dict()
+    for name in available_backends(engine):
+        if name == 'process' and (os.cpu_count() or 1) < 2:
+            continue
+        if deadline is not None and best is not None and time.perf_counter() >= deadline:
+            break
+
+        backend = BACKENDS[name](engine)
+        entities = sample_entities(engine.nodes_num, sample_size)
+
+        start = time.perf_counter()
+        evaluated = 0
+        while evaluated < sample_size:
+            backend.evaluate(entities[evaluated:evaluated + chunk], dict())
+            evaluated += chunk
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        times[name] = (time.perf_counter() - start) * sample_size / min(evaluated, sample_size)
+
+        if best is None or times[name] < times[best.name]:
+            if best is not None:
+                best.close()
+            best = backend
+        else:
+            backend.close()
+
+    return best, times
+
+
+def create_backend(name, engine, deadline=None):
+    """
+    Creates evaluation backend
+
+    :param name: str
+        Name of registered backend or auto for the fastest one
+    :param engine: Engine
+        Engine with loaded data, items have to be marked for static greedy
+    :param deadline: float, optional
+        Value of time.perf_counter() when benchmark of auto selection should stop
+    :return: object
+        Backend
+    """
+    if name == 'auto':
+        key = (engine.instance_hash, engine.population_size, engine.knapsack_method, engine.greedy_type,
+               engine.greedy_method)
+        if key not in engine.backend_choices:
+            backend = select_backend(engine, deadline=deadline)[0]
+            if deadline is None or time.perf_counter() < deadline:
+                # benchmark stopped by deadline may not have measured all backends
+                engine.backend_choices[key] = backend.name
+            return backend
+        name = engine.backend_choices[key]
+
+    if name not in BACKENDS:
+        print('Evaluation backend error')
+        exit(1)
+    if name not in available_backends(engine):
+        # settings not supported by backend, reference path is used
+        name = 'object'
+
+    return BACKENDS[name](engine)
+
+
+def check_backends(engine, sample_size=100, seed=0):
+    """
+    Checks if all available backends give exactly the same fitness as reference backend
+
+    :param engine: Engine
+        Engine with loaded data, items have to be marked for static greedy
+    :param sample_size: int, optional
+        Number of sampled paths
+    :param seed: int, optional
+        Seed of sample
+    :return: dict
+        Dictionary mapping backend name -> number of paths with different fitness
+    """
+    reference = sample_entities(engine.nodes_num, sample_size, seed)
+    ObjectBackend(engine).evaluate(reference, dict())
+
+    mismatches = dict()
+    for name in available_backends(engine):
+        backend = BACKENDS[name](engine)
+        entities = sample_entities(engine.nodes_num, sample_size, seed)
+        try:
+            backend.evaluate(entities, dict())
+        finally:
+            backend.close()
+
+        mismatches[name] = sum(e.fitness != r.fitness for e, r in zip(entities, reference))
+
+    return mismatches
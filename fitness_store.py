@@ -0,0 +1,159 @@
+import array
+import hashlib
+import sqlite3
+import time
+
+
+def path_hash(key):
+    """
+    Creates compact hash of path
+
+    :param key: tuple
+        Order of visited nodes
+    :return: bytes
+        16 bytes digest
+    """
+    return hashlib.blake2b(array.array('i', key).tobytes(), digest_size=16).digest()
+
+
+class FitnessStore:
+    """
+    Fitness values shared between runs and processes, stored in SQLite file
+
+    Entries are keyed by (instance hash, greedy setting, path hash). File is opened in WAL mode, so many processes
+    can read while one writes. New values are buffered and written in single transaction. When number of entries
+    exceeds limit, least recently written entries are evicted.
+
+    path - Path to SQLite file
+    max_entries - Maximal number of stored values
+    batch_size - Number of buffered values written at once
+    """
+
+    def __init__(self, path, max_entries=1000000, batch_size=1000):
+        """
+        :param path: str
+            Path to SQLite file, created if it doesn't exist
+        :param max_entries: int, optional
+            Maximal number of stored values
+        :param batch_size: int, optional
+            Number of buffered values written at once
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.pending = []
+
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS fitness ('
+                                'instance TEXT, greedy TEXT, path BLOB, value REAL, used REAL, '
+                                'PRIMARY KEY (instance, greedy, path)) WITHOUT ROWID')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS fitness_used ON fitness (used)')
+        self.connection.commit()
+
+    def get(self, instance, greedy, key):
+        """
+        Reads stored fitness
+
+        :param instance: str
+            Hash of problem instance
+        :param greedy: str
+            Greedy items selection setting
+        :param key: tuple
+            Order of visited nodes
+        :return: float
+            Fitness, None if not stored
+        """
+        row = self.connection.execute('SELECT value FROM fitness WHERE instance = ? AND greedy = ? AND path = ?',
+                                      (instance, greedy, path_hash(key))).fetchone()
+
+        return None if row is None else row[0]
+
+    def put(self, instance, greedy, key, value):
+        """
+        Buffers fitness to store
+
+        :param instance: str
+            Hash of problem instance
+        :param greedy: str
+            Greedy items selection setting
+        :param key: tuple
+            Order of visited nodes
+        :param value: float
+            Fitness
+        """
+        self.pending.append((instance, greedy, path_hash(key), value, time.time()))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered values and evicts the oldest entries over limit
+        """
+        if len(self.pending) == 0:
+            return
+
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?)', self.pending)
+            self.pending = []
+
+            count = self.connection.execute('SELECT COUNT(*) FROM fitness').fetchone()[0]
+            if count > self.max_entries:
+                self.connection.execute('DELETE FROM fitness WHERE used <= '
+                                        '(SELECT used FROM fitness ORDER BY used LIMIT 1 OFFSET ?)',
+                                        (count - self.max_entries - 1,))
+
+    def close(self):
+        """
+        Writes buffered values and closes file
+        """
+        self.flush()
+        self.connection.close()
+
+
+class StoredFitnessDict(dict):
+    """
+    Fitness dictionary falling back to persistent store on miss, new values are saved in both
+
+    Length of dictionary is number of paths used in current run, as for plain dictionary.
+    """
+
+    def __init__(self, store, instance, greedy, values=None):
+        """
+        :param store: FitnessStore
+            Persistent store
+        :param instance: str
+            Hash of problem instance
+        :param greedy: str
+            Greedy items selection setting
+        :param values: dict, optional
+            Values already calculated in current run
+        """
+        super().__init__(values if values is not None else dict())
+        self.store = store
+        self.instance = instance
+        self.greedy = greedy
+        self.hits = 0
+
+    def __contains__(self, key):
+        """
+        Checks dictionary, then store, value found in store is cached in dictionary
+        """
+        if dict.__contains__(self, key):
+            return True
+
+        value = self.store.get(self.instance, self.greedy, key)
+        if value is None:
+            return False
+
+        dict.__setitem__(self, key, value)
+        self.hits += 1
+
+        return True
+
+    def __setitem__(self, key, value):
+        """
+        Saves value in dictionary and store
+        """
+        dict.__setitem__(self, key, value)
+        self.store.put(self.instance, self.greedy, key, value)
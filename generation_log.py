@@ -0,0 +1,355 @@
+import collections
+import math
+import os
+import struct
+
+try:
+    import sqlalchemy as sql
+except ImportError:
+    # only database sink needs it
+    sql = None
+
+
+class GenerationRecord:
+    """
+    Statistics of single generation stored as fixed size binary record
+
+    Only values listed in FIELDS can be stored, setting other attribute raises AttributeError,
+    so sinks never silently drop values.
+
+    FIELDS - Names of stored values in record order
+    FORMAT - struct format of single record
+    SIZE - Size of single record in bytes
+    """
+    FIELDS = ('num', 'min', 'avg', 'max', 'unique', 'p25', 'p50', 'p75', 'distance', 'entropy')
+    __slots__ = FIELDS
+    FORMAT = '<I9d'
+    SIZE = struct.calcsize(FORMAT)
+
+    def __init__(self, num, min_f, avg_f, max_f, unique=math.nan, p25=math.nan, p50=math.nan, p75=math.nan,
+                 distance=math.nan, entropy=math.nan):
+        """
+        :param num: int
+            Generation number
+        :param min_f: float
+            Minimal fitness
+        :param avg_f: float
+            Average fitness
+        :param max_f: float
+            Maximal fitness
+        :param unique: float, optional
+            Ratio of unique paths in population
+        :param p25: float, optional
+            25th percentile of fitness, nan if not collected
+        :param p50: float, optional
+            Median of fitness, nan if not collected
+        :param p75: float, optional
+            75th percentile of fitness, nan if not collected
+        :param distance: float, optional
+            Mean pairwise edge distance of paths, nan if not collected
+        :param entropy: float, optional
+            Normalized entropy of edges frequency, nan if not collected
+        """
+        self.num = num
+        self.min = min_f
+        self.avg = avg_f
+        self.max = max_f
+        self.unique = unique
+        self.p25 = p25
+        self.p50 = p50
+        self.p75 = p75
+        self.distance = distance
+        self.entropy = entropy
+
+    def pack(self):
+        """
+        Encodes record
+
+        :return: bytes
+            Binary record
+        """
+        values = [getattr(self, name) for name in GenerationRecord.FIELDS]
+
+        return struct.pack(GenerationRecord.FORMAT, *values)
+
+    @staticmethod
+    def unpack(data):
+        """
+        Decodes record
+
+        :param data: bytes
+            Binary record
+        :return: GenerationRecord
+            Decoded record
+        """
+        return GenerationRecord(*struct.unpack(GenerationRecord.FORMAT, data))
+
+
+class MemorySink:
+    """
+    Keeps only last records in ring buffer
+
+    Records are stored encoded, so only GenerationRecord.FIELDS are kept.
+
+    buffer - Encoded newest records
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        :param capacity: int, optional
+            Maximal number of kept records
+        """
+        self.buffer = collections.deque(maxlen=capacity)
+
+    def write(self, record):
+        """
+        Saves record
+
+        :param record: GenerationRecord
+            Generation statistics
+        """
+        self.buffer.append(record.pack())
+
+    def records(self):
+        """
+        Iterates over stored records from the oldest
+
+        :return: generator
+            Generator of GenerationRecord
+        """
+        for data in self.buffer:
+            yield GenerationRecord.unpack(data)
+
+    def flush(self):
+        """
+        Nothing to flush in memory
+        """
+
+    def clear(self):
+        """
+        Removes all records
+        """
+        self.buffer.clear()
+
+    def snapshot(self):
+        """
+        Creates state saved in checkpoint
+
+        :return: list
+            Encoded records
+        """
+        return list(self.buffer)
+
+    def restore(self, snapshot):
+        """
+        Replaces records with records saved in checkpoint
+
+        :param snapshot: list
+            Result of snapshot, None for no records
+        """
+        self.buffer.clear()
+        if snapshot is not None:
+            self.buffer.extend(snapshot)
+
+    def close(self):
+        """
+        Nothing to close in memory
+        """
+
+
+class FileSink:
+    """
+    Appends records to binary file, so memory usage does not depend on run length
+
+    path - Path to the log file
+    """
+
+    def __init__(self, path, append=False):
+        """
+        :param path: str
+            Path to the log file
+        :param append: bool, optional
+            If existing records should be kept, needed for resuming run from checkpoint,
+            otherwise the file is truncated on creation
+        """
+        self.path = path
+        self.file = open(path, 'ab' if append else 'wb')
+
+    def write(self, record):
+        """
+        Saves record
+
+        :param record: GenerationRecord
+            Generation statistics
+        """
+        self.file.write(record.pack())
+
+    def records(self):
+        """
+        Iterates over stored records from the oldest
+
+        :return: generator
+            Generator of GenerationRecord
+        """
+        self.flush()
+        with open(self.path, 'rb') as f:
+            while True:
+                data = f.read(GenerationRecord.SIZE)
+                if len(data) < GenerationRecord.SIZE:
+                    break
+                yield GenerationRecord.unpack(data)
+
+    def flush(self):
+        """
+        Writes buffered records to disk
+        """
+        self.file.flush()
+
+    def clear(self):
+        """
+        Removes all records
+        """
+        self.file.seek(0)
+        self.file.truncate()
+
+    def snapshot(self):
+        """
+        Creates state saved in checkpoint
+
+        :return: int
+            Size of written records in bytes
+        """
+        self.flush()
+
+        return self.file.tell()
+
+    def restore(self, snapshot):
+        """
+        Drops records written after checkpoint was saved
+
+        :param snapshot: int
+            Result of snapshot, None for no records
+        """
+        size = snapshot or 0
+        self.flush()
+        if os.path.getsize(self.path) < size:
+            print('Log file is shorter than checkpoint, open it in append mode to resume')
+            exit(1)
+        self.file.truncate(size)
+        self.file.seek(size)
+
+    def close(self):
+        """
+        Closes and removes log file
+        """
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def null_nan(value):
+    """
+    :return: float
+        Value, None if it is nan
+    """
+    return None if math.isnan(value) else value
+
+
+class DatabaseSink:
+    """
+    Inserts records into `Generations` table in batches of fixed size
+
+    Table has no columns for percentiles, they are not inserted.
+
+    db_conn - DB connection
+    test_id - Id of test in `Tests` table
+    batch_size - Number of rows in single insert
+    """
+
+    def __init__(self, db_conn, test_id, batch_size=100, diversity=False):
+        """
+        :param db_conn: Connection
+            DB connection
+        :param test_id: int
+            Id of test the generations belong to
+        :param batch_size: int, optional
+            Number of rows in single insert
+        :param diversity: bool, optional
+            If unique ratio, edge distance and edge entropy columns should be inserted
+        """
+        self.db_conn = db_conn
+        self.test_id = test_id
+        self.batch_size = batch_size
+        self.diversity = diversity
+        self.batch = []
+
+    def write(self, record):
+        """
+        Saves record, inserts batch when full
+
+        :param record: GenerationRecord
+            Generation statistics
+        """
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def records(self):
+        """
+        Records are not read back from db
+
+        :return: list
+            Empty list
+        """
+        return []
+
+    def flush(self):
+        """
+        Inserts buffered records
+        """
+        if len(self.batch) == 0:
+            return
+
+        # values are bound as parameters, nan is not valid number in SQL so it is stored as NULL
+        rows = [{'num': r.num, 'max_f': r.max, 'avg_f': r.avg, 'min_f': r.min, 'unique_r': null_nan(r.unique),
+                 'div_dist': null_nan(r.distance), 'div_ent': null_nan(r.entropy), 'id_TEST': self.test_id}
+                for r in self.batch]
+        if self.diversity:
+            data_query = 'INSERT INTO `Generations` (num, max_f, avg_f, min_f, unique_r, div_dist, div_ent, id_TEST) ' \
+                         'VALUES (:num, :max_f, :avg_f, :min_f, :unique_r, :div_dist, :div_ent, :id_TEST)'
+        else:
+            data_query = 'INSERT INTO `Generations` (num, max_f, avg_f, min_f, id_TEST) ' \
+                         'VALUES (:num, :max_f, :avg_f, :min_f, :id_TEST)'
+        self.db_conn.execute(sql.text(data_query), rows)
+
+        self.batch = []
+
+    def clear(self):
+        """
+        Drops not inserted records
+        """
+        self.batch = []
+
+    def snapshot(self):
+        """
+        Inserted rows are not tracked, database sink can't be checkpointed
+
+        :return: None
+        """
+        return None
+
+    def restore(self, snapshot):
+        """
+        Resume would duplicate rows inserted after checkpoint, so it is refused
+
+        :param snapshot: None
+            Result of snapshot
+        """
+        print('Run with database sink can\'t be resumed')
+        exit(1)
+
+    def close(self):
+        """
+        Inserts remaining records
+        """
+        self.flush()
@@ -6,7 +6,12 @@ class Genotype:
     Genotype representing encoded path between nodes
 
     nodes_order - Order of visited nodes
+
+    MUTATIONS - Names of available mutations
+    CROSSOVERS - Names of available crossovers
     """
+    MUTATIONS = ('swap', 'inverse', 'shuffle', 'neighbour')
+    CROSSOVERS = ('simple', 'ox', 'cx', 'pmx', 'erx')
 
     def __init__(self, nodes_num=None):
         """
@@ -50,17 +55,26 @@ class Genotype:
 
         return phenotype
 
-    def mutate(self, method='swap'):
+    def mutate(self, method='swap', neighbours=None):
         """
         Mutates genotype with given method
 
         :param method: str, optional
             Name of the mutation
+        :param neighbours: list, optional
+            List of nearest nodes ids for every node, required by neighbour mutation
         """
         mutations = {'swap': self.mutation_swap,
                      'inverse': self.mutation_inverse,
                      'shuffle': self.mutation_shuffle}
 
+        if method == 'neighbour':
+            if neighbours is None:
+                print('Mutation neighbours error')
+                exit(1)
+            self.mutation_neighbour(neighbours)
+            return
+
         if method not in mutations:
             print('Mutation type error')
             exit(1)
@@ -101,6 +115,27 @@ class Genotype:
 
         self.nodes_order[pos1:pos2] = fragment
 
+    def mutation_neighbour(self, neighbours):
+        """
+        Mutation inverses fragment so random node gets one of its nearest nodes as next or previous node,
+        it is 2-opt move with new edge taken from candidate list
+
+        :param neighbours: list
+            List of nearest nodes ids for every node
+        """
+        pos1 = random.randrange(len(self.nodes_order))
+        candidates = neighbours[self.nodes_order[pos1]]
+        if len(candidates) == 0:
+            return
+        pos2 = self.nodes_order.index(random.choice(candidates))
+
+        if pos1 < pos2:
+            # node at pos1 is followed by neighbour
+            self.nodes_order[pos1 + 1:pos2 + 1] = reversed(self.nodes_order[pos1 + 1:pos2 + 1])
+        else:
+            # neighbour precedes node at pos1
+            self.nodes_order[pos2:pos1] = reversed(self.nodes_order[pos2:pos1])
+
     def crossover(self, genotype, method='simple'):
         """
         Executes given type of crossover
@@ -115,7 +150,8 @@ class Genotype:
         crossovers = {'simple': self.crossover_simple,
                       'ox': self.crossover_ox,
                       'cx': self.crossover_cx,
-                      'pmx': self.crossover_pmx}
+                      'pmx': self.crossover_pmx,
+                      'erx': self.crossover_erx}
 
         if method not in crossovers:
             print('Crossover type error')
@@ -290,3 +326,82 @@ class Genotype:
         child_genotype.nodes_order = child_order
 
         return child_genotype
+
+    def crossover_erx(self, genotype):
+        """
+        Edge recombination crossover (ERX), builds child only from edges of both parents where possible
+        Child starts in the first node of p1, next node is the neighbour in edge map with the fewest remaining
+        neighbours, ties are broken toward successor of current node in p1 and then randomly, when current node
+        has no neighbours left random unvisited node is picked
+            edge map - undirected edges of both parents, at most 4 neighbours for every node
+        Preferring p1 successor keeps direction of p1, so common tour of both parents is not reversed
+
+        :param genotype: Genotype
+            Parent 2 genotype
+        :return: Genotype
+            Child genotype
+        """
+        n = len(self.nodes_order)
+
+        # flat edge map, neighbours of node i are at 4 * i ... 4 * i + degree[i] - 1
+        neighbours = [0] * (4 * n)
+        degree = [0] * n
+        for order in (self.nodes_order, genotype.nodes_order):
+            previous = order[-1]
+            for node in order:
+                for a, b in ((previous, node), (node, previous)):
+                    start = 4 * a
+                    d = degree[a]
+                    if b not in neighbours[start:start + d]:
+                        neighbours[start + d] = b
+                        degree[a] = d + 1
+                previous = node
+
+        # next node of every node in p1
+        successor = [0] * n
+        previous = self.nodes_order[-1]
+        for node in self.nodes_order:
+            successor[previous] = node
+            previous = node
+
+        # unvisited nodes with their positions for constant time removal
+        unvisited = list(range(n))
+        position = list(range(n))
+
+        child_order = []
+        current = self.nodes_order[0]
+        while True:
+            child_order.append(current)
+
+            last = unvisited.pop()
+            if last != current:
+                unvisited[position[current]] = last
+                position[last] = position[current]
+            if len(unvisited) == 0:
+                break
+
+            # remove current node from edge map
+            start = 4 * current
+            candidates = neighbours[start:start + degree[current]]
+            for m in candidates:
+                m_start = 4 * m
+                i = neighbours.index(current, m_start, m_start + degree[m])
+                degree[m] -= 1
+                neighbours[i] = neighbours[m_start + degree[m]]
+
+            if len(candidates) == 0:
+                current = unvisited[random.randrange(len(unvisited))]
+            elif len(candidates) == 1:
+                current = candidates[0]
+            else:
+                fewest = min(degree[m] for m in candidates)
+                candidates = [m for m in candidates if degree[m] == fewest]
+                if successor[current] in candidates:
+                    current = successor[current]
+                else:
+                    current = candidates[random.randrange(len(candidates))] if len(candidates) > 1 else candidates[0]
+
+        child_genotype = Genotype()
+        child_genotype.nodes_order = child_order
+
+        return child_genotype
@@ -0,0 +1,218 @@
+import time
+
+
+class LocalSearch:
+    """
+    Memetic local search improving entities with 2-opt and Or-opt moves
+
+    Moves are restricted to candidate lists of k nearest nodes and evaluated with delta of the objective
+    computed only over the changed part of the path. Because stolen items have to be known for every node
+    it works only with statically marked items.
+
+    distances - Matrix of distances between nodes
+    neighbours - List of k nearest nodes ids for every node
+    weights - Weight of items stolen in every node
+    min_speed - Minimal speed
+    max_speed - Maximal speed
+    max_weight - Capacity of knapsack
+    """
+
+    def __init__(self, nodes, min_speed, max_speed, max_weight, neighbours_num=10, spatial_index=None,
+                 distances=None):
+        """
+        :param nodes: list
+            List of all nodes, items have to be already marked
+        :param min_speed: float
+            Speed with full bag
+        :param max_speed: float
+            Speed with empty bag
+        :param max_weight: int
+            Capacity of bag
+        :param neighbours_num: int, optional
+            Number of nearest nodes considered for every move
+        :param spatial_index: KDTree, optional
+            Index of node positions used to find nearest nodes, without it all distances are sorted
+        :param distances: list, optional
+            Rows of already calculated distances, calculated from nodes if not given
+        """
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.max_weight = max_weight
+
+        if distances is not None:
+            self.distances = distances
+        else:
+            self.distances = [[n1.calculate_distance_to(n2) for n2 in nodes] for n1 in nodes]
+        self.weights = [node.steal()[1] for node in nodes]
+
+        neighbours_num = min(neighbours_num, len(nodes) - 1)
+        if spatial_index is not None:
+            self.neighbours = spatial_index.neighbour_lists(neighbours_num)
+        else:
+            self.neighbours = []
+            for i, row in enumerate(self.distances):
+                closest = sorted(range(len(row)), key=lambda j: row[j])
+                self.neighbours.append([j for j in closest if j != i][:neighbours_num])
+
+    def improve(self, entity, deadline):
+        """
+        Improves entity path with first improvement strategy until local optimum or deadline is reached
+        First node of the path is never moved
+
+        :param entity: Entity
+            Entity to improve, its fitness is cleared if path was changed
+        :param deadline: float
+            Value of time.perf_counter() after which search is stopped
+        :return: bool
+            If path was changed
+        """
+        order = entity.genotype.nodes_order
+        if len(order) < 4:
+            return False
+
+        changed = False
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self.two_opt(order, deadline) or self.or_opt(order, deadline)
+            changed = changed or improved
+
+        if changed:
+            entity.fitness = None
+
+        return changed
+
+    def speed_factor(self, weight):
+        """
+        Calculates time needed to travel unit distance with given weight
+
+        :param weight: int
+            Weight of the bag
+        :return: float
+            Inverse of speed
+        """
+        return 1 / (self.max_speed - weight * (self.max_speed - self.min_speed) / self.max_weight)
+
+    def prepare(self, order):
+        """
+        Calculates positions, cumulative weights and cumulative times for given path
+
+        :param order: list
+            Order of visited nodes
+        :return: tuple
+            Positions of nodes, weight after every position, time before every edge
+        """
+        nodes_num = len(order)
+        positions = [0] * nodes_num
+        cum_weights = [0] * nodes_num
+        cum_times = [0] * (nodes_num + 1)
+
+        weight = 0
+        for k, node in enumerate(order):
+            positions[node] = k
+            weight += self.weights[node]
+            cum_weights[k] = weight
+            next_node = order[(k + 1) % nodes_num]
+            cum_times[k + 1] = cum_times[k] + self.distances[node][next_node] * self.speed_factor(weight)
+
+        return positions, cum_weights, cum_times
+
+    def window_time(self, prev_node, prev_weight, sequence, next_node):
+        """
+        Calculates travel time from prev_node through sequence to next_node
+
+        :param prev_node: int
+            Node preceding sequence
+        :param prev_weight: int
+            Bag weight when leaving prev_node
+        :param sequence: list
+            Nodes visited in order
+        :param next_node: int
+            Node following sequence
+        :return: float
+            Travel time
+        """
+        total = self.distances[prev_node][sequence[0]] * self.speed_factor(prev_weight)
+
+        weight = prev_weight
+        for k, node in enumerate(sequence):
+            weight += self.weights[node]
+            following = sequence[k + 1] if k + 1 < len(sequence) else next_node
+            total += self.distances[node][following] * self.speed_factor(weight)
+
+        return total
+
+    def delta(self, order, cum_weights, cum_times, lo, sequence):
+        """
+        Calculates change of travel time after replacing order[lo:lo + len(sequence)] with sequence
+
+        :return: float
+            Negative value means shorter travel time
+        """
+        hi = lo + len(sequence) - 1
+        next_node = order[(hi + 1) % len(order)]
+
+        old_time = cum_times[hi + 1] - cum_times[lo - 1]
+        new_time = self.window_time(order[lo - 1], cum_weights[lo - 1], sequence, next_node)
+
+        return new_time - old_time
+
+    def two_opt(self, order, deadline):
+        """
+        Searches for improving 2-opt move (reversal of path fragment) and applies first found
+
+        :return: bool
+            If move was applied
+        """
+        nodes_num = len(order)
+        positions, cum_weights, cum_times = self.prepare(order)
+
+        for i in range(nodes_num - 2):
+            if time.perf_counter() >= deadline:
+                return False
+            for candidate in self.neighbours[order[i]]:
+                j = positions[candidate]
+                if j <= i + 1:
+                    continue
+
+                # new edge order[i] -> order[j], reverse <i + 1, j>
+                sequence = order[j:i:-1]
+                if self.delta(order, cum_weights, cum_times, i + 1, sequence) < -1e-9:
+                    order[i + 1:j + 1] = sequence
+                    return True
+
+        return False
+
+    def or_opt(self, order, deadline, max_length=3):
+        """
+        Searches for improving Or-opt move (relocation of up to max_length nodes) and applies first found
+
+        :return: bool
+            If move was applied
+        """
+        nodes_num = len(order)
+        positions, cum_weights, cum_times = self.prepare(order)
+
+        for length in range(1, max_length + 1):
+            for start in range(1, nodes_num - length + 1):
+                if time.perf_counter() >= deadline:
+                    return False
+                end = start + length
+                segment = order[start:end]
+                for candidate in self.neighbours[segment[0]]:
+                    # insert segment right after candidate
+                    target = positions[candidate]
+                    if start - 1 <= target < end:
+                        continue
+
+                    if target < start:
+                        lo = target + 1
+                        sequence = segment + order[lo:start]
+                    else:
+                        lo = start
+                        sequence = order[end:target + 1] + segment
+
+                    if self.delta(order, cum_weights, cum_times, lo, sequence) < -1e-9:
+                        order[lo:lo + len(sequence)] = sequence
+                        return True
+
+        return False
@@ -0,0 +1,64 @@
+import sys
+
+from generation_log import GenerationRecord, MemorySink
+
+
+def container_size(container, sample_size):
+    """
+    Estimates size of container and its elements from single sample
+
+    :param container: object
+        List or dictionary
+    :param sample_size: int
+        Size of single element with all its referenced objects
+    :return: int
+        Size in bytes
+    """
+    return sys.getsizeof(container) + len(container) * sample_size
+
+
+def entity_size(entity):
+    """
+    Estimates size of entity with its genotype
+
+    :param entity: Entity
+        Sample entity
+    :return: int
+        Size in bytes
+    """
+    size = sys.getsizeof(entity) + sys.getsizeof(entity.__dict__) + sys.getsizeof(entity.fitness)
+    if entity.genotype is not None:
+        genotype = entity.genotype
+        size += sys.getsizeof(genotype) + sys.getsizeof(genotype.__dict__) + sys.getsizeof(genotype.nodes_order)
+
+    return size
+
+
+def engine_footprint(engine):
+    """
+    Estimates memory used by engine structures growing during run, problem data is not included
+
+    :param engine: Engine
+        Measured engine
+    :return: dict
+        Dictionary mapping structure name -> size in bytes
+    """
+    path_size = sys.getsizeof(()) + 8 * (engine.nodes_num or 0)
+
+    cache = container_size(engine.fitness_dict, path_size + sys.getsizeof(0.))
+
+    population = sys.getsizeof(engine.population)
+    if len(engine.population) > 0:
+        population = container_size(engine.population, entity_size(engine.population[0]))
+
+    logs = sum(container_size(v, sys.getsizeof(0.)) for v in engine.logged_data.values())
+    if isinstance(engine.log_sink, MemorySink):
+        logs += container_size(engine.log_sink.buffer, GenerationRecord.SIZE + sys.getsizeof(b''))
+
+    buffers = 0
+    if engine.diversity is not None:
+        buffers += sys.getsizeof(engine.diversity.counts) + container_size(engine.diversity.paths, path_size)
+    if engine.random_tours is not None:
+        buffers += sys.getsizeof(engine.random_tours) + sys.getsizeof(engine.random_fitness)
+
+    return {'cache': cache, 'population': population, 'logs': logs, 'buffers': buffers}
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def resident_memory():
+    """
+    Reads resident memory of current process
+
+    Uses /proc on Linux, elsewhere peak resident memory from resource module is returned
+
+    :return: int
+        Size in bytes, 0 if it can't be read
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    """
+    Operational counters and gauges periodically written to file
+
+    Prometheus text format file is replaced atomically, so it can be read by node exporter textfile collector,
+    JSON lines format appends one object with all values per write.
+    Rates are calculated from counters between writes.
+
+    path - Path to output file
+    output_format - prometheus or jsonl
+    interval - Minimal number of seconds between writes
+    prefix - Prefix of metric names
+    counters - Dictionary mapping name -> monotonically increasing value
+    gauges - Dictionary mapping name -> current value
+    RATES - Dictionary mapping gauge name -> counter name, gauges are set to counter increase per second
+    """
+    RATES = {'generations_per_second': 'generations_total',
+             'evaluations_per_second': 'evaluations_total'}
+
+    def __init__(self, path, output_format='prometheus', interval=10., prefix='ttp_'):
+        """
+        :param path: str
+            Path to output file, for prometheus format it should end with .prom
+        :param output_format: str, optional
+            Format of file
+                -prometheus - text exposition format
+                -jsonl - JSON lines
+        :param interval: float, optional
+            Minimal number of seconds between writes
+        :param prefix: str, optional
+            Prefix of metric names
+        """
+        if output_format not in ('prometheus', 'jsonl'):
+            print('Metrics format error')
+            exit(1)
+
+        self.path = path
+        self.output_format = output_format
+        self.interval = interval
+        self.prefix = prefix
+
+        self.counters = dict()
+        self.gauges = dict()
+
+        self.last_write = None
+        self.last_counters = dict()
+
+    def inc(self, name, value=1):
+        """
+        Increases counter
+
+        :param name: str
+            Name of counter
+        :param value: float, optional
+            Increase
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """
+        Sets gauge
+
+        :param name: str
+            Name of gauge
+        :param value: float
+            Value
+        """
+        self.gauges[name] = value
+
+    def observe(self, name, value):
+        """
+        Records single measurement as _sum and _count counters and last value gauge
+
+        :param name: str
+            Name of measured value
+        :param value: float
+            Measured value
+        """
+        self.inc(name + '_sum', value)
+        self.inc(name + '_count')
+        self.set(name + '_last', value)
+
+    def update_rates(self, now):
+        """
+        Sets rate gauges from counters increase since last write
+
+        :param now: float
+            Value of time.perf_counter()
+        """
+        if self.last_write is not None and now > self.last_write:
+            elapsed = now - self.last_write
+            for gauge, counter in Metrics.RATES.items():
+                increase = self.counters.get(counter, 0) - self.last_counters.get(counter, 0)
+                self.gauges[gauge] = increase / elapsed
+
+        evaluations = self.counters.get('evaluations_total', 0)
+        if evaluations > 0:
+            self.gauges['cache_hit_ratio'] = 1 - self.counters.get('fitness_computed_total', 0) / evaluations
+
+        self.gauges['resident_memory_bytes'] = resident_memory()
+
+        self.last_write = now
+        self.last_counters = dict(self.counters)
+
+    def maybe_write(self):
+        """
+        Writes metrics if interval passed since last write
+        """
+        if self.last_write is None or time.perf_counter() - self.last_write >= self.interval:
+            self.write()
+
+    def write(self):
+        """
+        Updates rates and writes all metrics
+        """
+        self.update_rates(time.perf_counter())
+
+        if self.output_format == 'jsonl':
+            line = dict(self.counters, **self.gauges)
+            line['timestamp'] = round(time.time(), 3)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(line, sort_keys=True) + '\n')
+            return
+
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append('# TYPE {}{} counter'.format(self.prefix, name))
+            lines.append('{}{} {}'.format(self.prefix, name, float(value)))
+        for name, value in sorted(self.gauges.items()):
+            lines.append('# TYPE {}{} gauge'.format(self.prefix, name))
+            lines.append('{}{} {}'.format(self.prefix, name, float(value)))
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
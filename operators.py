@@ -0,0 +1,118 @@
+import math
+import random
+
+
+class OperatorStats:
+    """
+    Statistics of single genetic operator
+
+    uses - Number of children created with operator
+    successes - Number of children better than their best parent
+    improvement - Total fitness improvement over best parent
+    cpu_time - Total time spent in operator in seconds
+    """
+
+    def __init__(self):
+        self.uses = 0
+        self.successes = 0
+        self.improvement = 0
+        self.cpu_time = 0
+
+    def rate(self):
+        """
+        Calculates fitness improvement per second of operator time
+
+        :return: float
+            Improvement rate
+        """
+        if self.cpu_time == 0:
+            return 0
+
+        return self.improvement / self.cpu_time
+
+    def summary(self):
+        """
+        Creates dictionary with statistics
+
+        :return: dict
+            Statistics
+        """
+        return {'uses': self.uses,
+                'successes': self.successes,
+                'improvement': round(self.improvement, 4),
+                'cpu_time': round(self.cpu_time, 4),
+                'rate': round(self.rate(), 4)}
+
+
+class OperatorSelector:
+    """
+    Multi-armed bandit choosing genetic operators
+
+    Operators are picked with UCB1 policy, reward of operator is its fitness improvement per second of operator time
+    normalized by the best rate in portfolio
+
+    stats - Dictionary mapping operator name -> OperatorStats
+    exploration - Weight of exploration term
+    """
+
+    def __init__(self, names, exploration=.5):
+        """
+        :param names: list
+            Names of operators in portfolio
+        :param exploration: float, optional
+            Weight of exploration term, higher values try worse operators more often
+        """
+        self.stats = {name: OperatorStats() for name in names}
+        self.exploration = exploration
+
+    def select(self):
+        """
+        Picks operator for next child
+
+        :return: str
+            Operator name
+        """
+        not_used = [name for name, s in self.stats.items() if s.uses == 0]
+        if len(not_used) > 0:
+            return random.choice(not_used)
+
+        total_uses = sum(s.uses for s in self.stats.values())
+        best_rate = max(s.rate() for s in self.stats.values())
+
+        best_name = None
+        best_score = None
+        for name, s in self.stats.items():
+            score = s.rate() / best_rate if best_rate > 0 else 0
+            score += self.exploration * math.sqrt(2 * math.log(total_uses) / s.uses)
+            if best_score is None or score > best_score:
+                best_name = name
+                best_score = score
+
+        return best_name
+
+    def update(self, name, improvement, cpu_time):
+        """
+        Credits operator with result of created child
+
+        :param name: str
+            Operator name
+        :param improvement: float
+            Child fitness minus best parent fitness
+        :param cpu_time: float
+            Time spent in operator
+        """
+        s = self.stats[name]
+        s.uses += 1
+        s.cpu_time += cpu_time
+        if improvement > 0:
+            s.successes += 1
+            s.improvement += improvement
+
+    def report(self):
+        """
+        Creates statistics of all operators
+
+        :return: dict
+            Dictionary mapping operator name -> statistics
+        """
+        return {name: s.summary() for name, s in self.stats.items()}
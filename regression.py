@@ -0,0 +1,226 @@
+import array
+import glob
+import gzip
+import multiprocessing
+import os
+import pickle
+import random
+import time
+
+from batch import INSTANCES
+from engine import Engine
+
+# fixed seeded configurations, together they use every selection, crossover, mutation and greedy setting
+# local search and adaptive operators are not included, their results depend on measured time
+CASES = {'tournament_pmx': {'population_size': 50, 'generations': 20},
+         'roulette_ox_swap': {'population_size': 50, 'generations': 20, 'selection_method': 'roulette',
+                              'crossover_method': 'ox', 'mutation_method': 'swap'},
+         'cx_shuffle_weight': {'population_size': 50, 'generations': 20, 'crossover_method': 'cx',
+                               'mutation_method': 'shuffle', 'greedy_method': 'weight'},
+         'simple_dynamic_value': {'population_size': 20, 'generations': 5, 'crossover_method': 'simple',
+                                  'greedy_type': 'dynamic', 'greedy_method': 'value'},
+         'steady_erx': {'population_size': 50, 'generations': 100, 'selection_method': 'steady',
+                        'crossover_method': 'erx', 'steady_batch': 4},
+         'random_search': {'population_size': 50, 'generations': 20, 'selection_method': 'random'},
+         'neighbour_mutation': {'population_size': 50, 'generations': 20, 'mutation_method': 'neighbour'},
+         'seeded': {'population_size': 50, 'generations': 20,
+                    'seeding': {'nearest': .1, 'nearest_random': .1, 'greedy_edge_random': .2}}}
+SEED = 0
+GOLDEN_DIR = 'golden/'
+
+
+def run_case(case):
+    """
+    Executes single seeded run
+
+    :param case: tuple
+        Instance file name and case name
+    :return: dict
+        Instance, case, fitness trajectories, final tour and fitness, run time
+    """
+    file_name, name = case
+
+    if file_name not in INSTANCES:
+        loaded = Engine()
+        loaded.load_data(file_name)
+        INSTANCES[file_name] = loaded
+
+    engine = Engine(**CASES[name])
+    engine.share_data(INSTANCES[file_name])
+
+    random.seed(SEED)
+    start = time.perf_counter()
+    engine.run()
+    run_time = time.perf_counter() - start
+
+    best = engine.population[0]
+
+    return {'instance': file_name,
+            'case': name,
+            'min': array.array('d', engine.logged_data['min']),
+            'avg': array.array('d', engine.logged_data['avg']),
+            'max': array.array('d', engine.logged_data['max']),
+            'tour': array.array('i', best.genotype.nodes_order),
+            'fitness': best.fitness,
+            'time': run_time}
+
+
+def run_cases(cases, workers=None):
+    """
+    Executes runs, in parallel if more than one worker is used
+
+    :param cases: list
+        List of (instance, case name) tuples
+    :param workers: int, optional
+        Number of worker processes, defaults to number of cores
+    :return: list
+        Results of run_case
+    """
+    for file_name in dict.fromkeys(instance for instance, _ in cases):
+        if file_name not in INSTANCES:
+            loaded = Engine()
+            loaded.load_data(file_name)
+            INSTANCES[file_name] = loaded
+
+    if workers == 1:
+        return [run_case(case) for case in cases]
+
+    context = multiprocessing.get_context('fork')
+    with context.Pool(workers) as pool:
+        return pool.map(run_case, cases, chunksize=1)
+
+
+def golden_path(file_name, golden_dir=GOLDEN_DIR):
+    """
+    :return: str
+        Path to golden file of instance
+    """
+    return os.path.join(golden_dir, file_name + '.golden')
+
+
+def save_golden(results, golden_dir=GOLDEN_DIR):
+    """
+    Writes results as golden outputs, one compressed file per instance
+
+    :param results: list
+        Results of run_case
+    :param golden_dir: str, optional
+        Directory of golden files
+    """
+    os.makedirs(golden_dir, exist_ok=True)
+
+    by_instance = dict()
+    for result in results:
+        by_instance.setdefault(result['instance'], dict())[result['case']] = result
+
+    for file_name, cases in by_instance.items():
+        path = golden_path(file_name, golden_dir)
+        if os.path.exists(path):
+            # cases not recorded now are kept
+            cases = dict(load_golden(file_name, golden_dir), **cases)
+        with gzip.open(path, 'wb') as f:
+            pickle.dump(cases, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_golden(file_name, golden_dir=GOLDEN_DIR):
+    """
+    Reads golden outputs of instance
+
+    :param file_name: str
+        Name of data file
+    :param golden_dir: str, optional
+        Directory of golden files
+    :return: dict
+        Dictionary mapping case name -> result, empty if there is no golden file
+    """
+    path = golden_path(file_name, golden_dir)
+    if not os.path.exists(path):
+        return dict()
+
+    with gzip.open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def relative_difference(a, b):
+    """
+    :return: float
+        Difference of values relative to the bigger absolute value
+    """
+    if a == b:
+        return 0
+
+    return abs(a - b) / max(abs(a), abs(b))
+
+
+def compare(result, golden, tolerance):
+    """
+    Compares run with golden output
+
+    :param result: dict
+        Result of run_case
+    :param golden: dict
+        Golden result of the same case, None if missing
+    :param tolerance: float
+        Maximal relative difference of fitness values
+    :return: dict
+        Report row
+    """
+    row = {'instance': result['instance'],
+           'case': result['case'],
+           'status': 'missing',
+           'max_difference': None,
+           'same_tour': None,
+           'time': round(result['time'], 4),
+           'golden_time': None,
+           'speedup': None}
+    if golden is None:
+        return row
+
+    difference = relative_difference(result['fitness'], golden['fitness'])
+    for key in ('min', 'avg', 'max'):
+        if len(result[key]) != len(golden[key]):
+            difference = float('inf')
+            break
+        for value, expected in zip(result[key], golden[key]):
+            difference = max(difference, relative_difference(value, expected))
+
+    row['max_difference'] = difference
+    row['same_tour'] = result['tour'] == golden['tour']
+    row['status'] = 'ok' if difference <= tolerance and row['same_tour'] else 'diff'
+    row['golden_time'] = round(golden['time'], 4)
+    if result['time'] > 0:
+        row['speedup'] = round(golden['time'] / result['time'], 4)
+
+    return row
+
+
+def check(pattern='*.ttp', cases=None, tolerance=1e-9, workers=None, record=False, golden_dir=GOLDEN_DIR):
+    """
+    Runs cases on matching instances and compares them with golden outputs or records new golden outputs
+
+    :param pattern: str, optional
+        Glob pattern of data files
+    :param cases: list, optional
+        Names of cases, defaults to all cases
+    :param tolerance: float, optional
+        Maximal relative difference of fitness values
+    :param workers: int, optional
+        Number of worker processes, defaults to number of cores
+    :param record: bool, optional
+        If results should be saved as golden outputs instead of being compared
+    :param golden_dir: str, optional
+        Directory of golden files
+    :return: list
+        Report rows
+    """
+    instances = sorted(os.path.basename(p) for p in glob.glob(os.path.join(Engine.DATA_DIR, pattern)))
+    names = list(CASES) if cases is None else list(cases)
+
+    results = run_cases([(i, n) for i in instances for n in names], workers)
+
+    if record:
+        save_golden(results, golden_dir)
+
+    golden = {i: load_golden(i, golden_dir) for i in instances}
+
+    return [compare(r, golden[r['instance']].get(r['case']), tolerance) for r in results]
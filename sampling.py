@@ -0,0 +1,130 @@
+import array
+import math
+import random
+
+
+def softmax_weights(fitness, temperature):
+    """
+    Calculates selection weights exp(z / temperature), where z is fitness scaled to <-1, 0> by range of population
+
+    Scaling makes weights independent of fitness units, the best entity has weight 1 and the worst exp(-1 / temperature),
+    so weights never overflow and sum is never 0.
+
+    :param fitness: list
+        Fitness of every entity
+    :param temperature: float
+        Positive temperature, lower value gives higher selection pressure
+    :return: array
+        Weights
+    """
+    if temperature <= 0:
+        print('Roulette temperature error')
+        exit(1)
+
+    max_f = max(fitness)
+    spread = max_f - min(fitness)
+    if spread == 0:
+        return array.array('d', [1.]) * len(fitness)
+
+    scale = 1 / (spread * temperature)
+
+    return array.array('d', [math.exp((f - max_f) * scale) for f in fitness])
+
+
+def rank_weights(fitness, pressure):
+    """
+    Calculates linear ranking weights divided by pressure, the best entity has weight 1 and the worst
+    (2 - pressure) / pressure, so the best weight is 1 as with softmax_weights
+
+    :param fitness: list
+        Fitness of every entity
+    :param pressure: float
+        Selection pressure in <1, 2>, 1 gives uniform selection
+    :return: array
+        Weights
+    """
+    if not 1 <= pressure <= 2:
+        print('Roulette pressure error')
+        exit(1)
+
+    n = len(fitness)
+    weights = array.array('d', bytes(8 * n))
+    if n == 1:
+        weights[0] = 1.
+        return weights
+
+    step = 2 * (pressure - 1) / (n - 1)
+    for rank, i in enumerate(sorted(range(n), key=fitness.__getitem__)):
+        weights[i] = (2 - pressure + rank * step) / pressure
+
+    return weights
+
+
+class AliasTable:
+    """
+    Walker's alias method for sampling indices with given weights in constant time per sample
+
+    Table is built in linear time with Vose's algorithm.
+
+    probability - Probability of keeping drawn column
+    alias - Index used when drawn column is not kept
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: sequence
+            Non-negative weights with positive sum
+        """
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or not total > 0:
+            print('Sampling weights error')
+            exit(1)
+
+        scaled = [w * n / total for w in weights]
+        self.probability = array.array('d', bytes(8 * n))
+        self.alias = array.array('i', range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s = small.pop()
+            g = large[-1]
+            self.probability[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1 - scaled[s]
+            if scaled[g] < 1:
+                small.append(large.pop())
+
+        # leftovers differ from 1 only by rounding errors
+        for i in small + large:
+            self.probability[i] = 1.
+
+    def __len__(self):
+        return len(self.probability)
+
+    def sample(self, k):
+        """
+        Draws indices with replacement
+
+        :param k: int
+            Number of indices
+        :return: list
+            Drawn indices
+        """
+        n = len(self.probability)
+        probability = self.probability
+        alias = self.alias
+        rand = random.random
+
+        result = []
+        for _ in range(k):
+            u = rand() * n
+            i = int(u)
+            if i == n:
+                # rounding of product
+                i = n - 1
+            # fractional part is uniform in <0, 1) and independent of column
+            result.append(i if u - i < probability[i] else alias[i])
+
+        return result
@@ -0,0 +1,280 @@
+import multiprocessing
+import random
+import time
+
+# number of closest unvisited nodes from which randomized nearest neighbour picks next node
+RANDOM_CHOICES = 3
+# maximal relative noise added to edge lengths by randomized greedy edge
+EDGE_NOISE = .2
+# number of tours built from one seed, chunks are the same for serial and parallel building
+CHUNK_SIZE = 8
+
+
+class Seeder:
+    """
+    Builds heuristic tours for initial population
+
+    Methods
+        nearest - nearest neighbour tour from random start
+        nearest_random - nearest neighbour tour, next node is picked from RANDOM_CHOICES closest unvisited nodes
+        greedy_edge - shortest edges are added while they don't create cycle or node of degree 3,
+                      fragments are joined by nearest endpoints
+        greedy_edge_random - greedy edge with lengths scaled by random noise
+
+    Only edges to k nearest nodes are considered, nodes without unvisited neighbours fall back to full scan.
+
+    spatial_index - KDTree of node positions
+    neighbours - List of k nearest nodes ids for every node
+    """
+    METHODS = ('nearest', 'nearest_random', 'greedy_edge', 'greedy_edge_random')
+
+    def __init__(self, spatial_index, neighbours_num=10):
+        """
+        :param spatial_index: KDTree
+            Index of node positions
+        :param neighbours_num: int, optional
+            Number of nearest nodes considered for every node
+        """
+        self.spatial_index = spatial_index
+        self.neighbours = spatial_index.neighbour_lists(neighbours_num)
+
+    def distance(self, id1, id2):
+        """
+        :return: float
+            Distance between nodes
+        """
+        x, y = self.spatial_index.points[id1]
+
+        return self.spatial_index.distance(x, y, id2)
+
+    def closest(self, node_id, candidates, k):
+        """
+        Finds k closest nodes from candidates by full scan
+
+        :param node_id: int
+            Id of node
+        :param candidates: iterable
+            Ids of candidate nodes
+        :param k: int
+            Number of nodes
+        :return: list
+            Node ids ordered by distance
+        """
+        return sorted(candidates, key=lambda j: (self.distance(node_id, j), j))[:k]
+
+    def tour(self, method, rng):
+        """
+        Builds single tour
+
+        :param method: str
+            Name of method
+        :param rng: Random
+            Random generator
+        :return: list
+            Order of visited nodes
+        """
+        if method == 'nearest':
+            return self.nearest_tour(rng, 1)
+        elif method == 'nearest_random':
+            return self.nearest_tour(rng, RANDOM_CHOICES)
+        elif method == 'greedy_edge':
+            return self.greedy_edge_tour(rng, 0)
+        elif method == 'greedy_edge_random':
+            return self.greedy_edge_tour(rng, EDGE_NOISE)
+        else:
+            print('Seeding method error')
+            exit(1)
+
+    def nearest_tour(self, rng, choices):
+        """
+        Builds nearest neighbour tour
+
+        :param rng: Random
+            Random generator
+        :param choices: int
+            Number of closest unvisited nodes from which next node is picked
+        :return: list
+            Order of visited nodes
+        """
+        nodes_num = len(self.neighbours)
+        visited = bytearray(nodes_num)
+        unvisited = set(range(nodes_num))
+
+        current = rng.randrange(nodes_num)
+        order = [current]
+        visited[current] = 1
+        unvisited.discard(current)
+        while unvisited:
+            candidates = [j for j in self.neighbours[current] if not visited[j]][:choices]
+            if len(candidates) == 0:
+                candidates = self.closest(current, unvisited, choices)
+
+            current = candidates[rng.randrange(len(candidates))] if choices > 1 else candidates[0]
+            order.append(current)
+            visited[current] = 1
+            unvisited.discard(current)
+
+        return order
+
+    def greedy_edge_tour(self, rng, noise):
+        """
+        Builds greedy edge tour
+
+        :param rng: Random
+            Random generator
+        :param noise: float
+            Maximal relative noise added to edge lengths, 0 for deterministic tour
+        :return: list
+            Order of visited nodes
+        """
+        nodes_num = len(self.neighbours)
+
+        edges = []
+        for i, row in enumerate(self.neighbours):
+            for j in row:
+                if i < j or i not in self.neighbours[j]:
+                    length = self.distance(i, j)
+                    if noise > 0:
+                        length *= 1 + noise * rng.random()
+                    edges.append((length, i, j))
+        edges.sort()
+
+        parent = list(range(nodes_num))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        adjacent = [[] for _ in range(nodes_num)]
+        for _, i, j in edges:
+            if len(adjacent[i]) < 2 and len(adjacent[j]) < 2:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[root_i] = root_j
+                    adjacent[i].append(j)
+                    adjacent[j].append(i)
+
+        # paths of fragments, single nodes are fragments too
+        fragments = []
+        seen = bytearray(nodes_num)
+        for start in range(nodes_num):
+            if seen[start] or len(adjacent[start]) == 2:
+                continue
+            fragment = [start]
+            seen[start] = 1
+            previous, current = None, start
+            while True:
+                following = [j for j in adjacent[current] if j != previous]
+                if len(following) == 0:
+                    break
+                previous, current = current, following[0]
+                fragment.append(current)
+                seen[current] = 1
+            fragments.append(fragment)
+
+        # joining fragments, the closest endpoint of remaining fragments is attached to the end of tour
+        endpoints = dict()
+        for k, fragment in enumerate(fragments):
+            endpoints[fragment[0]] = k
+            endpoints[fragment[-1]] = k
+
+        first = rng.randrange(len(fragments))
+        order = list(fragments[first])
+        del endpoints[fragments[first][0]]
+        endpoints.pop(fragments[first][-1], None)
+        while endpoints:
+            end = self.closest(order[-1], endpoints, 1)[0]
+            fragment = fragments[endpoints[end]]
+            del endpoints[fragment[0]]
+            endpoints.pop(fragment[-1], None)
+            order.extend(fragment if fragment[0] == end else reversed(fragment))
+
+        return order
+
+    def build(self, counts, workers=1, deadline=None):
+        """
+        Builds tours for all methods, every chunk of CHUNK_SIZE tours has its own seed drawn from global
+        random generator, so result doesn't depend on number of workers
+
+        :param counts: dict
+            Dictionary mapping method name -> number of tours
+        :param workers: int, optional
+            Number of processes, 1 builds tours in current process
+        :param deadline: float, optional
+            Value of time.perf_counter() after which no more tours are built, tours finished before are returned
+        :return: list
+            List of tours
+        """
+        chunks = []
+        for method in Seeder.METHODS:
+            count = counts.get(method, 0)
+            for start in range(0, count, CHUNK_SIZE):
+                chunks.append((method, min(CHUNK_SIZE, count - start), random.getrandbits(64)))
+
+        results = []
+        if workers > 1 and len(chunks) > 1 and not multiprocessing.current_process().daemon:
+            context = multiprocessing.get_context('fork')
+            with context.Pool(workers, initializer=init_worker, initargs=(self,)) as pool:
+                # pool is terminated with unfinished chunks when deadline passes
+                for result in pool.imap(build_chunk, chunks):
+                    results.append(result)
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        break
+        else:
+            for chunk in chunks:
+                results.append(self.build_chunk(chunk, deadline))
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+
+        return [tour for result in results for tour in result]
+
+    def build_chunk(self, chunk, deadline=None):
+        """
+        Builds chunk of tours
+
+        :param chunk: tuple
+            Method name, number of tours and seed
+        :param deadline: float, optional
+            Value of time.perf_counter() after which no more tours are built
+        :return: list
+            List of tours
+        """
+        method, count, seed = chunk
+        rng = random.Random(seed)
+
+        tours = []
+        for _ in range(count):
+            tours.append(self.tour(method, rng))
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        return tours
+
+
+# seeder of pool worker, set by pool initializer
+worker_seeder = None
+
+
+def init_worker(seeder):
+    """
+    Stores seeder in pool worker
+
+    :param seeder: Seeder
+        Seeder with problem data
+    """
+    global worker_seeder
+    worker_seeder = seeder
+
+
+def build_chunk(chunk):
+    """
+    Builds chunk of tours in pool worker
+
+    :param chunk: tuple
+        Method name, number of tours and seed
+    :return: list
+        List of tours
+    """
+    return worker_seeder.build_chunk(chunk)
@@ -0,0 +1,580 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import time
+
+# never open plot windows
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from batch import run_job
+from engine import Engine
+
+PROGRESS_EVERY = 10
+
+
+def validate_job(spec):
+    """
+    Checks job specification before it is queued
+
+    :param spec: dict
+        Job specification
+    :return: str
+        Error message, None if specification is valid
+    """
+    if not isinstance(spec, dict):
+        return 'job must be an object'
+    if not isinstance(spec.get('instance'), str) or len(spec['instance']) == 0:
+        return 'job must have instance name'
+    if not os.path.isfile(os.path.join(Engine.DATA_DIR, spec['instance'])):
+        return 'unknown instance ' + spec['instance']
+
+    if 'mutable_param' in spec:
+        if not isinstance(spec['mutable_param'], str):
+            return 'mutable_param must be a string'
+        if not isinstance(spec.get('values'), list) or len(spec['values']) == 0:
+            return 'values must be a non-empty list'
+        if not isinstance(spec.get('parameters') or dict(), dict):
+            return 'parameters must be an object'
+        sample = spec.get('sample', 1)
+        if not is_positive_int(sample):
+            return 'sample must be a positive integer'
+        configs = [dict(spec.get('parameters') or dict(), **{spec['mutable_param']: v}) for v in spec['values']]
+    else:
+        configs = spec.get('configs', [dict()])
+        if not isinstance(configs, list) or len(configs) == 0:
+            return 'configs must be a non-empty list'
+        if not all(isinstance(c, dict) for c in configs):
+            return 'every config must be an object'
+        seeds = spec.get('seeds', [0])
+        if not isinstance(seeds, list) or len(seeds) == 0:
+            return 'seeds must be a non-empty list'
+        if not all(isinstance(s, int) and not isinstance(s, bool) for s in seeds):
+            return 'seeds must be integers'
+
+    # engine compares generation number with equality, other values would block queue forever
+    for config in configs:
+        generations = config.get('generations', 100)
+        if not is_positive_int(generations) and not (generations is None and config.get('time_limit')):
+            return 'generations must be a positive integer or null with time_limit'
+
+    return None
+
+
+def is_positive_int(value):
+    """
+    :return: bool
+        If value is integer greater than 0
+    """
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def expand_job(spec):
+    """
+    Creates list of runs from job specification
+
+    Specification is either
+        {"instance": ..., "configs": [{...}, ...], "seeds": [...]}
+    or Test-like
+        {"instance": ..., "mutable_param": ..., "values": [...], "sample": n, "parameters": {...}}
+
+    :param spec: dict
+        Job specification
+    :return: list
+        List of (instance, config, seed) tuples
+    """
+    error = validate_job(spec)
+    if error is not None:
+        raise ValueError(error)
+
+    instance = spec['instance']
+    if 'mutable_param' in spec:
+        parameters = spec.get('parameters') or dict()
+        configs = [dict(parameters, **{spec['mutable_param']: v}) for v in spec['values']]
+        seeds = range(spec.get('sample', 1))
+    else:
+        configs = spec.get('configs', [dict()])
+        seeds = spec.get('seeds', [0])
+
+    return [(instance, c, s) for c in configs for s in seeds]
+
+
+def run_service_job(job_id, run_index, run, progress_queue):
+    """
+    Executes single run in worker process and reports progress
+
+    :param job_id: int
+        Id of job
+    :param run_index: int
+        Index of run in job
+    :param run: tuple
+        Instance, config, seed
+    :param progress_queue: Queue
+        Queue for (job id, run index, generation, fitness) tuples
+    :return: dict
+        Result row
+    """
+
+    def progress(generation, fitness):
+        if generation % PROGRESS_EVERY == 0:
+            progress_queue.put((job_id, run_index, generation, fitness))
+
+    return run_job(run, progress)
+
+
+class JobQueue:
+    """
+    Jobs persisted in SQLite file, jobs interrupted by restart are queued again
+
+    path - Path to queue file
+    """
+
+    def __init__(self, path):
+        """
+        :param path: str
+            Path to queue file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, spec TEXT, '
+                                'status TEXT, results TEXT, submitted REAL)')
+        self.connection.execute('UPDATE jobs SET status = \'queued\' WHERE status = \'running\'')
+        self.connection.commit()
+
+    def submit(self, spec):
+        """
+        Adds job to queue
+
+        :param spec: dict
+            Job specification
+        :return: int
+            Job id
+        """
+        with self.connection:
+            cursor = self.connection.execute('INSERT INTO jobs (spec, status, submitted) VALUES (?, ?, ?)',
+                                             (json.dumps(spec), 'queued', time.time()))
+        return cursor.lastrowid
+
+    def next(self):
+        """
+        Takes the oldest queued job
+
+        :return: tuple
+            Job id and specification, None if queue is empty
+        """
+        row = self.connection.execute('SELECT id, spec FROM jobs WHERE status = \'queued\' '
+                                      'ORDER BY id LIMIT 1').fetchone()
+        if row is None:
+            return None
+
+        with self.connection:
+            self.connection.execute('UPDATE jobs SET status = \'running\' WHERE id = ?', (row[0],))
+
+        return row[0], json.loads(row[1])
+
+    def finish(self, job_id, status, results):
+        """
+        Stores job results
+
+        :param job_id: int
+            Job id
+        :param status: str
+            Final status
+        :param results: list
+            Result rows
+        """
+        with self.connection:
+            self.connection.execute('UPDATE jobs SET status = ?, results = ? WHERE id = ?',
+                                    (status, json.dumps(results), job_id))
+
+    def status(self, job_id=None):
+        """
+        Lists jobs
+
+        :param job_id: int, optional
+            Id of single job
+        :return: list
+            List of job dictionaries
+        """
+        query = 'SELECT id, status, results FROM jobs'
+        args = ()
+        if job_id is not None:
+            query += ' WHERE id = ?'
+            args = (job_id,)
+
+        return [{'id': i, 'status': s, 'results': json.loads(r) if r is not None else None}
+                for i, s, r in self.connection.execute(query, args)]
+
+
+class ExperimentService:
+    """
+    Local experiment service, accepts jobs over Unix socket or local TCP port, queues them on disk
+    and executes their runs in process pool
+
+    Protocol is newline delimited JSON, requests:
+        {"cmd": "submit", "job": {...}} -> {"id": ...}
+        {"cmd": "status", "id": ...} -> {"jobs": [...]}
+        {"cmd": "watch", "id": ...} -> stream of progress messages ending with {"event": "done", ...}
+
+    jobs - Persistent job queue
+    workers - Number of worker processes
+    max_jobs - Number of jobs executed at once, their runs share worker processes
+    progress - Progress of running jobs
+    watchers - Dictionary mapping job id -> list of client queues
+    """
+
+    def __init__(self, queue_path='service.db', workers=None, max_jobs=2):
+        """
+        :param queue_path: str, optional
+            Path to job queue file
+        :param workers: int, optional
+            Number of worker processes, defaults to number of cores
+        :param max_jobs: int, optional
+            Number of jobs executed at once
+        """
+        self.jobs = JobQueue(queue_path)
+        self.workers = workers or os.cpu_count()
+        self.max_jobs = max_jobs
+        self.progress = dict()
+        self.watchers = dict()
+        self.wakeup = None
+        self.progress_queue = None
+
+    async def serve(self, socket_path=None, port=None):
+        """
+        Runs service until cancelled
+
+        :param socket_path: str, optional
+            Path to Unix socket
+        :param port: int, optional
+            Local TCP port, used when socket path is not given
+        """
+        self.wakeup = asyncio.Event()
+        manager = multiprocessing.Manager()
+        self.progress_queue = manager.Queue()
+
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host='127.0.0.1', port=port)
+
+        context = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            async with server:
+                await asyncio.gather(self.dispatch(pool), self.pump_progress())
+
+    async def dispatch(self, pool):
+        """
+        Starts queued jobs in order while fewer than max_jobs jobs are running
+
+        :param pool: ProcessPoolExecutor
+            Worker processes
+        """
+        running = set()
+
+        def finished(task):
+            running.discard(task)
+            self.wakeup.set()
+
+        while True:
+            job = self.jobs.next() if len(running) < self.max_jobs else None
+            if job is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            task = asyncio.create_task(self.execute_job(pool, *job))
+            running.add(task)
+            task.add_done_callback(finished)
+
+    async def execute_job(self, pool, job_id, spec):
+        """
+        Executes job and stores its results, job that can't be executed is marked as failed
+
+        :param pool: ProcessPoolExecutor
+            Worker processes
+        :param job_id: int
+            Job id
+        :param spec: dict
+            Job specification
+        """
+        try:
+            status, results = await self.run_job(pool, job_id, spec)
+        except Exception as e:
+            # job must not stay running, it would be queued again on every restart
+            status, results = 'failed', [{'error': repr(e)}]
+
+        self.jobs.finish(job_id, status, results)
+        self.notify(job_id, {'event': 'done', 'id': job_id, 'status': status})
+        self.progress.pop(job_id, None)
+
+    async def run_job(self, pool, job_id, spec):
+        """
+        Executes runs of single job in parallel
+        At most workers runs of job are submitted at once, so runs of concurrent jobs alternate in pool queue
+
+        :param pool: ProcessPoolExecutor
+            Worker processes
+        :param job_id: int
+            Job id
+        :param spec: dict
+            Job specification
+        :return: tuple
+            Final status and result rows
+        """
+        loop = asyncio.get_running_loop()
+        runs = expand_job(spec)
+        generations = spec.get('configs', [spec.get('parameters') or dict()])[0].get('generations', 100)
+        self.progress[job_id] = {'runs': len(runs), 'done': 0, 'generations': generations or 100,
+                                 'current': dict(), 'best': None, 'start': time.time()}
+
+        in_flight = asyncio.Semaphore(self.workers)
+
+        async def execute(run_index, run):
+            async with in_flight:
+                return await loop.run_in_executor(pool, run_service_job, job_id, run_index, run, self.progress_queue)
+
+        futures = [execute(i, run) for i, run in enumerate(runs)]
+        results = []
+        status = 'done'
+        for future in asyncio.as_completed(futures):
+            try:
+                row = await future
+            except (Exception, SystemExit) as e:
+                # engine reports configuration errors by exit
+                status = 'failed'
+                row = {'error': repr(e)}
+            results.append(row)
+            self.progress[job_id]['done'] += 1
+            self.notify(job_id, self.progress_message(job_id))
+
+        return status, results
+
+    async def pump_progress(self):
+        """
+        Moves progress reports from worker processes to watching clients
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                report = await loop.run_in_executor(None, self.progress_queue.get, True, .5)
+            except queue.Empty:
+                continue
+
+            job_id, run_index, generation, fitness = report
+            state = self.progress.get(job_id)
+            if state is None:
+                continue
+            state['current'][run_index] = generation
+            if state['best'] is None or fitness > state['best']:
+                state['best'] = fitness
+            self.notify(job_id, self.progress_message(job_id, generation))
+
+    def progress_message(self, job_id, generation=None):
+        """
+        Creates progress message with estimated time to finish job
+
+        :param job_id: int
+            Job id
+        :param generation: int, optional
+            Last reported generation
+        :return: dict
+            Message
+        """
+        state = self.progress[job_id]
+        partial = sum(min(g / state['generations'], 1) for g in state['current'].values())
+        fraction = min((state['done'] + partial) / state['runs'], 1)
+        elapsed = time.time() - state['start']
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+
+        return {'event': 'progress', 'id': job_id, 'generation': generation, 'runs_done': state['done'],
+                'runs': state['runs'], 'best': state['best'], 'eta': None if eta is None else round(eta, 1)}
+
+    def notify(self, job_id, message):
+        """
+        Sends message to all clients watching job
+
+        :param job_id: int
+            Job id
+        :param message: dict
+            Message
+        """
+        for client in self.watchers.get(job_id, []):
+            client.put_nowait(message)
+
+    async def handle_client(self, reader, writer):
+        """
+        Serves single client connection
+
+        :param reader: StreamReader
+            Client input
+        :param writer: StreamWriter
+            Client output
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise TypeError('request must be an object')
+
+                    if request['cmd'] == 'submit':
+                        error = validate_job(request['job'])
+                        if error is not None:
+                            await self.send(writer, {'error': error})
+                            continue
+                        job_id = self.jobs.submit(request['job'])
+                        self.wakeup.set()
+                        await self.send(writer, {'id': job_id})
+                    elif request['cmd'] == 'status':
+                        await self.send(writer, {'jobs': self.jobs.status(request.get('id'))})
+                    elif request['cmd'] == 'watch':
+                        await self.watch(writer, request['id'])
+                    else:
+                        await self.send(writer, {'error': 'unknown command'})
+                except json.JSONDecodeError:
+                    await self.send(writer, {'error': 'invalid JSON'})
+                except KeyError as e:
+                    await self.send(writer, {'error': 'missing field ' + str(e)})
+                except TypeError as e:
+                    await self.send(writer, {'error': str(e)})
+        finally:
+            writer.close()
+
+    async def watch(self, writer, job_id):
+        """
+        Streams progress of job to client until it is finished
+
+        :param writer: StreamWriter
+            Client output
+        :param job_id: int
+            Job id
+        """
+        status = self.jobs.status(job_id)
+        if len(status) == 0 or status[0]['status'] in ('done', 'failed'):
+            await self.send(writer, {'event': 'done', 'id': job_id,
+                                     'status': status[0]['status'] if status else 'unknown'})
+            return
+
+        client = asyncio.Queue()
+        self.watchers.setdefault(job_id, []).append(client)
+        try:
+            while True:
+                message = await client.get()
+                await self.send(writer, message)
+                if message['event'] == 'done':
+                    break
+        finally:
+            self.watchers[job_id].remove(client)
+
+    @staticmethod
+    async def send(writer, message):
+        """
+        Writes JSON message line
+
+        :param writer: StreamWriter
+            Client output
+        :param message: dict
+            Message
+        """
+        writer.write((json.dumps(message) + '\n').encode())
+        await writer.drain()
+
+
+async def request(message, socket_path=None, port=None):
+    """
+    Sends request to service and yields response lines
+
+    :param message: dict
+        Request
+    :param socket_path: str, optional
+        Path to Unix socket
+    :param port: int, optional
+        Local TCP port
+    :return: async generator
+        Generator of response dictionaries
+    """
+    if socket_path is not None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    writer.write((json.dumps(message) + '\n').encode())
+    await writer.drain()
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        yield response
+        if message['cmd'] != 'watch' or response.get('event') == 'done':
+            break
+
+    writer.close()
+
+
+async def client_main(args):
+    """
+    Executes client command and prints responses
+
+    :param args: Namespace
+        Parsed arguments
+    """
+    if args.command == 'submit':
+        with open(args.spec) as f:
+            message = {'cmd': 'submit', 'job': json.load(f)}
+    elif args.command == 'status':
+        message = {'cmd': 'status', 'id': args.id}
+    else:
+        message = {'cmd': 'watch', 'id': args.id}
+
+    async for response in request(message, args.socket, args.port):
+        print(json.dumps(response), flush=True)
+
+
+def main(argv=None):
+    """
+    Command line entry point of service and its clients
+
+    :param argv: list, optional
+        Arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description='Local experiment service')
+    parser.add_argument('--socket', default=None, help='Unix socket path')
+    parser.add_argument('--port', type=int, default=8765, help='local TCP port when socket is not given')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve')
+    serve_parser.add_argument('--queue', default='service.db', help='job queue file')
+    serve_parser.add_argument('--workers', type=int, default=None)
+    serve_parser.add_argument('--jobs', type=int, default=2, help='number of jobs executed at once')
+    submit_parser = subparsers.add_parser('submit')
+    submit_parser.add_argument('spec', help='JSON file with job specification')
+    status_parser = subparsers.add_parser('status')
+    status_parser.add_argument('id', type=int, nargs='?', default=None)
+    watch_parser = subparsers.add_parser('watch')
+    watch_parser.add_argument('id', type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        service = ExperimentService(args.queue, args.workers, args.jobs)
+        try:
+            asyncio.run(service.serve(args.socket, args.port))
+        except KeyboardInterrupt:
+            sys.exit(0)
+    else:
+        asyncio.run(client_main(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import array
+from multiprocessing import shared_memory
+
+from entity import ItemTable, Node
+from spatial import KDTree
+
+
+class SharedInstance:
+    """
+    Problem data placed in shared memory blocks, worker processes attach to them by name without copying
+
+    Owner creates blocks from loaded engine and passes descriptor to workers. Engines created from attached instance
+    read coordinates, item columns and optional distance matrix directly from shared memory, only mask of stolen
+    items and node objects are private. Owner unlinks blocks on close, workers only detach.
+
+    descriptor - Picklable description of blocks and problem parameters
+    blocks - Dictionary mapping column name -> SharedMemory
+    columns - Dictionary mapping column name -> memoryview of block
+    owner - If blocks were created by this object
+
+    COLUMNS - Names of item columns of ItemTable
+    PARAMETERS - Names of engine attributes with problem parameters
+    """
+    COLUMNS = ('values', 'weights', 'nodes', 'ratios', 'offsets', 'input_order')
+    PARAMETERS = ('problem_name', 'instance_hash', 'knapsack_data_type', 'nodes_num', 'items_num', 'max_capacity',
+                  'min_speed', 'max_speed', 'renting_ratio', 'edge_weight_type')
+
+    def __init__(self, descriptor, owner=False):
+        """
+        Attaches to existing blocks, use create to make new ones
+
+        :param descriptor: dict
+            Description of blocks and problem parameters
+        :param owner: bool, optional
+            If blocks should be unlinked on close
+        """
+        self.descriptor = descriptor
+        self.owner = owner
+        self.blocks = dict()
+        self.columns = dict()
+        for column, (name, typecode, length) in descriptor['blocks'].items():
+            block = shared_memory.SharedMemory(name=name)
+            self.blocks[column] = block
+            self.columns[column] = block.buf[:length * array.array(typecode).itemsize].cast(typecode)
+
+    @classmethod
+    def create(cls, engine, distances=False):
+        """
+        Copies problem data of engine to new shared memory blocks
+
+        :param engine: Engine
+            Engine with loaded data
+        :param distances: bool, optional
+            If matrix of distances between nodes should be shared too
+        :return: SharedInstance
+            Owner of blocks
+        """
+        data = {'coordinates': array.array('d', [c for node in engine.nodes for c in node.position])}
+        for column in SharedInstance.COLUMNS:
+            data[column] = array.array(getattr(engine.items, column).typecode, getattr(engine.items, column))
+        if distances:
+            data['distances'] = array.array('d', [n1.calculate_distance_to(n2)
+                                                  for n1 in engine.nodes for n2 in engine.nodes])
+
+        blocks = dict()
+        descriptor = {'blocks': dict(),
+                      'parameters': {name: getattr(engine, name) for name in SharedInstance.PARAMETERS}}
+        try:
+            for column, values in data.items():
+                # empty blocks are not allowed
+                block = shared_memory.SharedMemory(create=True, size=max(len(values) * values.itemsize, 1))
+                blocks[column] = block
+                block.buf[:len(values) * values.itemsize] = values.tobytes()
+                descriptor['blocks'][column] = (block.name, values.typecode, len(values))
+        except BaseException:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+
+        instance = cls.__new__(cls)
+        instance.descriptor = descriptor
+        instance.owner = True
+        instance.blocks = blocks
+        instance.columns = {column: block.buf[:len(data[column]) * data[column].itemsize].cast(data[column].typecode)
+                            for column, block in blocks.items()}
+
+        return instance
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def load_into(self, engine):
+        """
+        Sets problem data of engine to shared data
+
+        :param engine: Engine
+            Engine without loaded data
+        """
+        for name, value in self.descriptor['parameters'].items():
+            setattr(engine, name, value)
+
+        engine.items = ItemTable.from_columns(*[self.columns[column] for column in SharedInstance.COLUMNS])
+
+        coordinates = self.columns['coordinates']
+        engine.nodes = [Node(coordinates[2 * i], coordinates[2 * i + 1], engine.items, i)
+                        for i in range(engine.nodes_num)]
+        engine.spatial_index = KDTree([node.position for node in engine.nodes])
+        engine.distance_matrix = self.columns.get('distances')
+
+    def close(self):
+        """
+        Detaches from blocks, owner also removes them
+
+        Engines loaded from this instance can't be used after close.
+        """
+        try:
+            for view in self.columns.values():
+                view.release()
+            for block in self.blocks.values():
+                block.close()
+        except BufferError:
+            # views are still used by engines, mapping is released together with them
+            pass
+        self.columns = dict()
+
+        if self.owner:
+            for block in self.blocks.values():
+                block.unlink()
+        self.blocks = dict()
@@ -0,0 +1,178 @@
+import array
+import heapq
+
+
+class KDTree:
+    """
+    Static 2-d tree over node positions for nearest neighbour and radius queries
+
+    Tree is implicit, subtree over positions [lo, hi) of ids has its root in the middle and is split
+    by axis stored for the root. Distances are calculated in the same way as in Node.calculate_distance_to
+    and ties are broken by node id, so results match sorting all nodes by distance.
+
+    points - List of (x, y) coordinates of nodes
+    ids - Node ids in tree order
+    axes - Split axis for every tree position, 0 - x, 1 - y
+    """
+
+    def __init__(self, points):
+        """
+        :param points: list
+            List of (x, y) coordinates, index is node id
+        """
+        self.points = list(points)
+        self.ids = array.array('i', range(len(self.points)))
+        self.axes = bytearray(len(self.points))
+
+        stack = [(0, len(self.points))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo < 1:
+                continue
+
+            segment = self.ids[lo:hi]
+            xs = [self.points[i][0] for i in segment]
+            ys = [self.points[i][1] for i in segment]
+            axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+
+            self.ids[lo:hi] = array.array('i', sorted(segment, key=lambda i: self.points[i][axis]))
+            mid = (lo + hi) // 2
+            self.axes[mid] = axis
+
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def __len__(self):
+        return len(self.points)
+
+    def distance(self, x, y, node_id):
+        """
+        Calculates distance from point to node
+
+        :param x: float
+            X coordinate
+        :param y: float
+            Y coordinate
+        :param node_id: int
+            Id of node
+        :return: float
+            Distance
+        """
+        x2, y2 = self.points[node_id]
+
+        return ((x2 - x) ** 2 + (y2 - y) ** 2) ** .5
+
+    def nearest(self, x, y, k, exclude=None):
+        """
+        Finds k nodes closest to point
+
+        :param x: float
+            X coordinate
+        :param y: float
+            Y coordinate
+        :param k: int
+            Number of nodes
+        :param exclude: int, optional
+            Id of node skipped in result, usually the node at the point
+        :return: list
+            Node ids ordered by distance
+        """
+        if k <= 0:
+            return []
+
+        # max heap of (-distance, -id), the farthest found node is on top
+        found = []
+        point = (x, y)
+
+        def search(lo, hi):
+            if hi - lo < 1:
+                return
+
+            mid = (lo + hi) // 2
+            node_id = self.ids[mid]
+            if node_id != exclude:
+                entry = (-self.distance(x, y, node_id), -node_id)
+                if len(found) < k:
+                    heapq.heappush(found, entry)
+                elif entry > found[0]:
+                    heapq.heapreplace(found, entry)
+
+            axis = self.axes[mid]
+            diff = point[axis] - self.points[node_id][axis]
+            if diff < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+
+            search(*near)
+            if len(found) < k or abs(diff) <= -found[0][0]:
+                search(*far)
+
+        search(0, len(self.ids))
+
+        return [-node_id for _, node_id in sorted(found, reverse=True)]
+
+    def within(self, x, y, radius):
+        """
+        Finds nodes not farther from point than radius
+
+        :param x: float
+            X coordinate
+        :param y: float
+            Y coordinate
+        :param radius: float
+            Maximal distance
+        :return: list
+            Node ids ordered by distance
+        """
+        found = []
+        point = (x, y)
+
+        stack = [(0, len(self.ids))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo < 1:
+                continue
+
+            mid = (lo + hi) // 2
+            node_id = self.ids[mid]
+            distance = self.distance(x, y, node_id)
+            if distance <= radius:
+                found.append((distance, node_id))
+
+            axis = self.axes[mid]
+            diff = point[axis] - self.points[node_id][axis]
+            if diff >= -radius:
+                stack.append((mid + 1, hi))
+            if diff <= radius:
+                stack.append((lo, mid))
+
+        return [node_id for _, node_id in sorted(found)]
+
+    def neighbours(self, node_id, k):
+        """
+        Finds k nodes closest to node
+
+        :param node_id: int
+            Id of node
+        :param k: int
+            Number of neighbours
+        :return: list
+            Node ids ordered by distance, without the node itself
+        """
+        x, y = self.points[node_id]
+
+        return self.nearest(x, y, k, exclude=node_id)
+
+    def neighbour_lists(self, k):
+        """
+        Creates candidate lists of k nearest nodes for all nodes
+
+        :param k: int
+            Number of neighbours
+        :return: list
+            List of neighbour lists, index is node id
+        """
+        k = min(k, len(self.points) - 1)
+
+        return [self.neighbours(i, k) for i in range(len(self.points))]
@@ -0,0 +1,117 @@
+import collections
+import heapq
+
+
+class SteadyPopulation:
+    """
+    Population for steady-state replacement, children replace the worst entities in place
+
+    Entities stay in the same list as in generational mode, best entity is always first and the rest is unordered.
+    Order by fitness is kept in heap, so replacing single entity and reading statistics doesn't depend on
+    population size.
+
+    population - List of entities, shared with engine
+    heap - Min heap of [fitness, number, slot, entity] entries, the worst entity is on top
+    entries - Heap entries by population slot
+    keys - Multiset of paths in population
+    fitness_sum - Sum of fitness of all entities
+    diversity - EdgeCounter updated with replaced paths, None if diversity is not logged
+    """
+
+    def __init__(self, population, diversity=None):
+        """
+        :param population: list
+            Tested entities, the best one has to be first
+        :param diversity: EdgeCounter, optional
+            Counter of population edges
+        """
+        self.population = population
+        self.entries = [[e.fitness, i, i, e] for i, e in enumerate(population)]
+        self.heap = list(self.entries)
+        heapq.heapify(self.heap)
+        self.number = len(population)
+
+        self.keys = collections.Counter(e.genotype.create_key() for e in population)
+        self.fitness_sum = sum(e.fitness for e in population)
+
+        self.diversity = diversity
+        if diversity is not None:
+            diversity.update(list(self.keys.elements()))
+
+    def __len__(self):
+        return len(self.population)
+
+    def __contains__(self, key):
+        """
+        Checks if path is in population
+
+        :param key: tuple
+            Order of visited nodes
+        """
+        return key in self.keys
+
+    def worst(self):
+        """
+        :return: float
+            Fitness of the worst entity
+        """
+        return self.heap[0][0]
+
+    def best(self):
+        """
+        :return: float
+            Fitness of the best entity
+        """
+        return self.population[0].fitness
+
+    def replace(self, child):
+        """
+        Replaces the worst entity with tested child, child worse than the worst entity is discarded
+
+        :param child: Entity
+            Tested entity
+        :return: bool
+            If child was inserted
+        """
+        if child.fitness < self.heap[0][0]:
+            return False
+
+        slot = self.heap[0][2]
+        old = self.population[slot]
+        entry = [child.fitness, self.number, slot, child]
+        self.number += 1
+        heapq.heapreplace(self.heap, entry)
+        self.entries[slot] = entry
+        self.population[slot] = child
+
+        old_key = old.genotype.create_key()
+        new_key = child.genotype.create_key()
+        self.keys[old_key] -= 1
+        if self.keys[old_key] == 0:
+            del self.keys[old_key]
+        self.keys[new_key] += 1
+        self.fitness_sum += child.fitness - old.fitness
+
+        if self.diversity is not None:
+            self.diversity.remove(old_key)
+            self.diversity.add(new_key)
+
+        if slot != 0 and child.fitness > self.population[0].fitness:
+            # keeping the best entity first
+            best_entry = self.entries[0]
+            best_entry[2], entry[2] = slot, 0
+            self.entries[0], self.entries[slot] = entry, best_entry
+            self.population[0], self.population[slot] = child, best_entry[3]
+
+        return True
+
+    def stats(self):
+        """
+        Calculates population statistics
+
+        :return: tuple
+            Min, avg and max fitness and ratio of unique paths
+        """
+        n = len(self.population)
+
+        return self.heap[0][0], self.fitness_sum / n, self.population[0].fitness, len(self.keys) / n